@@ -3,7 +3,7 @@ from flask import Flask, render_template, jsonify, request, redirect, url_for, s
 from dotenv import load_dotenv
 import os
 import json
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from functools import wraps
 import pytz
 import platform
@@ -15,6 +15,11 @@ from mcrcon import MCRcon
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 import sql_calendar
 import schedule_events
+import event_series
+import rcon_rate_limiter
+import log_policy
+import log_search
+import log_stream
 from database_manager import db_manager
 
 load_dotenv()
@@ -126,6 +131,7 @@ def load_event_files():
 
 def load_logs_from_db():
     try:
+        sql_calendar.flush_logs()
         db = get_db()
         query = """
         SELECT timestamp, message, log_level 
@@ -196,7 +202,7 @@ def api_delete_task():
         db = get_db()
         
         # Check if task exists and is not completed
-        check_query = "SELECT completed FROM event_tasks WHERE id = ?"
+        check_query = "SELECT completed, event_id, task_name, scheduled_time FROM event_tasks WHERE id = ?"
         result = db.db_query_with_params(check_query, (task_id,))
         
         if not result:
@@ -210,6 +216,12 @@ def api_delete_task():
         db.db_query_with_params(delete_query, (task_id,))
         
         sql_calendar.log_message(f"Admin deleted task {task_id} via web interface", "ADMIN")
+
+        # Pending display tasks are all that keep the scoreboard rule going, so queue the one after it
+        _, event_id, task_name, scheduled_time = result[0]
+        if task_name == schedule_events.SCOREBOARD_TASK_NAME:
+            skipped = datetime.fromisoformat(scheduled_time.replace('Z', '+00:00'))
+            schedule_events.top_up_scoreboard_tasks(event_id, after=skipped)
         
         return jsonify({
             "success": True,
@@ -219,6 +231,69 @@ def api_delete_task():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
 
+@app.route("/api/events/scoreboard-interval", methods=["POST"])
+@login_required
+def api_update_scoreboard_interval():
+    try:
+        event_id = request.json.get("event_id")
+        if not event_id:
+            return jsonify({"success": False, "error": "No event ID provided"})
+        
+        try:
+            scoreboard_interval = int(request.json.get("scoreboard_interval"))
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "scoreboard_interval must be a whole number of seconds"})
+        
+        if scoreboard_interval < 1:
+            return jsonify({"success": False, "error": "scoreboard_interval must be at least 1 second"})
+        
+        # Only the event row and its few pending display tasks change
+        if not schedule_events.change_scoreboard_interval(event_id, scoreboard_interval):
+            return jsonify({"success": False, "error": "Event not found"})
+        
+        sql_calendar.log_message(f"Admin set scoreboard interval of event {event_id} to {scoreboard_interval}s via web interface", "ADMIN")
+        
+        return jsonify({
+            "success": True,
+            "message": f"Scoreboard interval updated to {scoreboard_interval}s"
+        })
+        
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
+
+@app.route("/api/series")
+@login_required
+def api_series():
+    series = sql_calendar.get_all_series()
+    for entry in series:
+        entry["next_unscheduled_start"] = None
+        upcoming = next(event_series.occurrences(entry, entry["next_occurrence"], datetime.max.replace(tzinfo=pytz.UTC)), None)
+        if upcoming:
+            entry["next_unscheduled_start"] = upcoming[1].strftime('%Y-%m-%dT%H:%M:%SZ')
+    return jsonify(series)
+
+@app.route("/api/series/delete", methods=["POST"])
+@login_required
+def api_delete_series():
+    try:
+        series_id = request.json.get("series_id")
+        if not series_id:
+            return jsonify({"success": False, "error": "No series ID provided"})
+        
+        deleted = sql_calendar.delete_series(series_id)
+        if deleted is None:
+            return jsonify({"success": False, "error": "Series not found"})
+        
+        sql_calendar.log_message(f"Admin deleted series {series_id} and {deleted} upcoming event(s) via web interface", "ADMIN")
+        
+        return jsonify({
+            "success": True,
+            "message": f"Series deleted along with {deleted} upcoming event(s)"
+        })
+        
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
@@ -353,6 +428,33 @@ def api_rcon_health():
             "player_count": 0
         })
     
+@app.route("/api/health/rcon-limiter")
+@login_required
+def api_rcon_limiter():
+    state = rcon_rate_limiter.load_state()
+    if state is None:
+        return jsonify({
+            "status": "idle",
+            "message": "No RCON traffic recorded yet"
+        })
+
+    try:
+        updated_at = datetime.strptime(state["updated_at"], '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+        age_seconds = int((datetime.now(timezone.utc) - updated_at).total_seconds())
+    except (KeyError, ValueError):
+        age_seconds = None
+
+    mspt = state.get("mspt")
+    throttled = state.get("rate_per_second", 0) <= state.get("min_rate", 0) * 1.5 or \
+        (mspt is not None and mspt > state.get("target_mspt", 50))
+
+    if age_seconds is None or age_seconds > 120:
+        state["status"] = "idle"
+    else:
+        state["status"] = "backing_off" if throttled else "ok"
+    state["age_seconds"] = age_seconds
+    return jsonify(state)
+
 @app.route("/api/health/overall")
 @login_required
 def api_overall_health():
@@ -543,6 +645,7 @@ def api_admin_unlock():
 @login_required
 def api_admin_clear_logs():
     try:
+        sql_calendar.flush_logs()
         db = get_db()
         
         count_query = "SELECT COUNT(*) FROM logs"
@@ -791,6 +894,47 @@ def api_test_connection():
             "error": f"Connection failed: {str(e)}"
         })
     
+@app.route("/api/settings/log-levels")
+@login_required
+def api_get_log_levels():
+    try:
+        return jsonify({
+            "levels": list(log_policy.LEVELS),
+            "env_default": log_policy.LOG_LEVEL,
+            "modules": [log_policy.DEFAULT_MODULE] + list(log_policy.KNOWN_MODULES),
+            "overrides": sql_calendar.get_log_settings(),
+            "cache_seconds": log_policy.LOG_POLICY_TTL
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/settings/log-levels", methods=["POST"])
+@login_required
+def api_update_log_levels():
+    try:
+        data = request.json or {}
+        module = (data.get("module") or "").strip()
+        level = data.get("level") or None
+        
+        if module != log_policy.DEFAULT_MODULE and module not in log_policy.KNOWN_MODULES:
+            return jsonify({"success": False, "error": f"Unknown module: {module}"}), 400
+        if level is not None and log_policy.normalize_level(level) is None:
+            return jsonify({"success": False, "error": f"Unknown log level: {level}"}), 400
+        
+        level = log_policy.normalize_level(level) if level else None
+        if not sql_calendar.set_log_level(module, level):
+            return jsonify({"success": False, "error": "Could not save log level"}), 500
+        
+        sql_calendar.log_message(f"Log level for {module} set to {level or 'inherit'} via web interface", "ADMIN")
+        
+        return jsonify({
+            "success": True,
+            "message": f"Log level for {module} is now {level or 'inherited'}. Running processes pick it up within {log_policy.LOG_POLICY_TTL:.0f}s."
+        })
+        
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route("/api/database/admin-delete-json", methods=["POST"])
 @login_required
 def api_admin_delete_json():
@@ -903,11 +1047,40 @@ def create_event():
         start_utc = start_dt.strftime('%Y-%m-%dT%H:%M:%SZ')
         end_utc = end_dt.strftime('%Y-%m-%dT%H:%M:%SZ')
 
-        unique_event_name = f"{name.replace(' ','-')}-{start_dt.strftime('%m-%d-%Y-%H%M')}"
+        unique_event_name = schedule_events.unique_event_name(name, start_dt)
 
         # Get scoreboard interval from settings or use default
         scoreboard_interval = int(os.getenv("SCOREBOARD_INTERVAL", "600"))
 
+        repeat = request.form.get("repeat", "none")
+        if repeat in event_series.FREQUENCY_DAYS:
+            try:
+                interval_count = int(request.form.get("repeat_interval") or 1)
+                repeat_count = request.form.get("repeat_count")
+                occurrence_limit = int(repeat_count) if repeat_count else None
+                repeat_until = request.form.get("repeat_until")
+                until_dt = None
+                if repeat_until:
+                    # The end date is inclusive: occurrences may start any time that day
+                    until_local = datetime.strptime(repeat_until, "%Y-%m-%d") + timedelta(days=1, seconds=-1)
+                    until_dt = tz.localize(until_local)
+
+                series_id, created = event_series.create_series(
+                    name, event_json, description, timezone_str, start_local,
+                    (end_dt - start_dt).total_seconds(), repeat, interval_count,
+                    occurrence_limit, until_dt, scoreboard_interval
+                )
+                sql_calendar.log_message_with_timestamp(f"Event series created via web interface: {name} (series {series_id})")
+                flash(f"Recurring event '{name}' created with {created} upcoming event(s) scheduled")
+                return redirect(url_for("index"))
+
+            except ValueError as e:
+                flash(f"Invalid repeat settings: {e}")
+                return redirect(url_for("create_event"))
+            except Exception as e:
+                flash(f"Error creating recurring event: {e}")
+                return redirect(url_for("create_event"))
+
         try:
             event_id = schedule_events.create_event_with_tasks(
                 unique_event_name, name, event_json, description, start_utc, end_utc, scoreboard_interval
@@ -1047,6 +1220,42 @@ def api_logs():
     logs = load_logs_from_db()
     return jsonify(logs)
 
+@app.route("/api/logs/stream")
+@login_required
+def api_logs_stream():
+    # EventSource sends Last-Event-ID when it reconnects; ?after= lets other clients resume too
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("after")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    sql_calendar.flush_logs()
+    return Response(
+        log_stream.sse_events(DATABASE_PATH, last_event_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/api/logs/search")
+@login_required
+def api_logs_search():
+    try:
+        sql_calendar.flush_logs()
+        levels = [level for level in request.args.get("level", "").split(",") if level.strip()]
+        result = log_search.search(
+            DATABASE_PATH,
+            text=request.args.get("q"),
+            levels=levels,
+            since=request.args.get("since") or None,
+            until=request.args.get("until") or None,
+            before_id=request.args.get("cursor", type=int),
+            limit=request.args.get("limit", log_search.DEFAULT_LIMIT, type=int)
+        )
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/api/event_json_content/<filename>")
 @login_required
 def api_event_json_content(filename):
@@ -13,7 +13,27 @@ CREATE TABLE IF NOT EXISTS events (
     event_started INTEGER DEFAULT 0,
     event_over INTEGER DEFAULT 0,
     last_scoreboard_time TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
-    scoreboard_interval INTEGER DEFAULT 600
+    scoreboard_interval INTEGER DEFAULT 600,
+    last_scoreboard_seconds INTEGER DEFAULT 0,
+    series_id INTEGER NULL
+);
+
+-- Recurring events: one row per rule, materialized into events a horizon ahead
+CREATE TABLE IF NOT EXISTS event_series (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    event_json TEXT,
+    description TEXT,
+    timezone TEXT NOT NULL,
+    first_start TEXT NOT NULL,
+    duration_seconds INTEGER NOT NULL,
+    frequency TEXT NOT NULL CHECK (frequency IN ('daily', 'weekly')),
+    interval_count INTEGER NOT NULL DEFAULT 1,
+    occurrence_limit INTEGER NULL,
+    until_time TEXT NULL,
+    scoreboard_interval INTEGER DEFAULT 600,
+    next_occurrence INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now'))
 );
 
 CREATE TABLE IF NOT EXISTS event_tasks (
@@ -46,6 +66,14 @@ CREATE TABLE IF NOT EXISTS logs (
     log_level TEXT DEFAULT 'INFO'
 );
 
+CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp);
+
+CREATE TABLE IF NOT EXISTS log_settings (
+    module TEXT PRIMARY KEY,
+    level TEXT NOT NULL CHECK (level IN ('TRACE', 'DEBUG', 'INFO', 'WARN', 'ERROR')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now'))
+);
+
 CREATE TABLE IF NOT EXISTS event_winners (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     event_id INTEGER NOT NULL,
@@ -1,21 +1,163 @@
+import os
+import random
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+DB_PRAGMA_PROFILE = os.getenv("DB_PRAGMA_PROFILE", "balanced")
+# Extra PRAGMAs applied after the profile, as "name=value;name=value"
+DEFAULT_PRAGMAS = os.getenv("DB_PRAGMAS", "")
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+DB_WRITE_RETRIES = int(os.getenv("DB_WRITE_RETRIES", 5))
+DB_RETRY_BASE_DELAY = 0.05
+
+# WAL lets the web app read while the event handler and its subprocesses write.
+# "legacy" keeps the rollback journal for filesystems where WAL's shared memory does not work (NFS, SMB).
+PRAGMA_PROFILES = {
+    "balanced": [
+        ("journal_mode", "WAL"), ("synchronous", "NORMAL"), ("cache_size", "-16000"),
+        ("mmap_size", "67108864"), ("temp_store", "MEMORY"), ("journal_size_limit", "67108864")
+    ],
+    "durable": [
+        ("journal_mode", "WAL"), ("synchronous", "FULL"), ("cache_size", "-16000")
+    ],
+    "low_memory": [
+        ("journal_mode", "WAL"), ("synchronous", "NORMAL"), ("cache_size", "-2000"), ("mmap_size", "0")
+    ],
+    "legacy": [
+        ("journal_mode", "DELETE"), ("synchronous", "FULL")
+    ]
+}
+
+def parse_pragmas(text):
+    pragmas = []
+    for item in (text or "").split(";"):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            pragmas.append((name.strip(), value.strip()))
+    return pragmas
+
+def profile_pragmas(profile=DB_PRAGMA_PROFILE, extra=DEFAULT_PRAGMAS):
+    """busy_timeout, the named profile's PRAGMAs, then any DB_PRAGMAS overrides"""
+    if profile not in PRAGMA_PROFILES:
+        print(f"Unknown DB_PRAGMA_PROFILE '{profile}', using 'balanced'")
+        profile = "balanced"
+    return [("busy_timeout", str(DB_BUSY_TIMEOUT_MS))] + PRAGMA_PROFILES[profile] + parse_pragmas(extra)
+
+def open_connection(database, pragmas=None, **connect_args):
+    """sqlite3.connect with the configured PRAGMA profile applied"""
+    connect_args.setdefault("timeout", DB_BUSY_TIMEOUT_MS / 1000)
+    db_conn = sqlite3.connect(database, **connect_args)
+    for name, value in (profile_pragmas() if pragmas is None else pragmas):
+        db_conn.execute(f"PRAGMA {name} = {value}")
+    return db_conn
+
+def is_locked_error(error):
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+def retry_locked(operation, retries=DB_WRITE_RETRIES):
+    """Call operation(), retrying with jittered backoff while the database is locked past busy_timeout"""
+    for attempt in range(retries + 1):
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if not is_locked_error(e) or attempt == retries:
+                raise
+            time.sleep(random.uniform(0, DB_RETRY_BASE_DELAY * (2 ** attempt)))
+
+class connection_provider():
+    """One connection per thread and process for a database file, with its PRAGMAs applied once"""
+
+    def __init__(self, database, pragmas=None):
+        self.database = database
+        self.pragmas = profile_pragmas() if pragmas is None else pragmas
+        self.stats = {"opened": 0}
+        self._local = threading.local()
+        # Connections inherited across fork() must not be used or closed by the child
+        self._inherited = []
+
+    def connection(self):
+        pid = os.getpid()
+        db_conn = getattr(self._local, "connection", None)
+        if db_conn is not None and self._local.pid != pid:
+            self._inherited.append(db_conn)
+            db_conn = None
+        if db_conn is None:
+            db_conn = self._open()
+            self._local.connection = db_conn
+            self._local.pid = pid
+        return db_conn
+
+    def close(self):
+        """Close the calling thread's connection; the next call opens a new one"""
+        db_conn = getattr(self._local, "connection", None)
+        if db_conn is not None and self._local.pid == os.getpid():
+            db_conn.close()
+        self._local.connection = None
+
+    def _open(self):
+        # Autocommit mode: transactions are started explicitly by db_manager.transaction()
+        db_conn = open_connection(self.database, self.pragmas, isolation_level=None)
+        self.stats["opened"] += 1
+        return db_conn
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+def get_provider(database, pragmas=None):
+    with _providers_lock:
+        provider = _providers.get(database)
+        if provider is None:
+            provider = connection_provider(database, pragmas)
+            _providers[database] = provider
+        return provider
 
 class db_manager():
 
     def __init__(self, database, schema_file):
         self.db = database
         self.schema_file = schema_file
+        self.provider = get_provider(database)
 
     def db_connect(self):
-        connection = sqlite3.connect(self.db)
+        """A new private connection; the caller closes it"""
+        connection = open_connection(self.db)
         return connection
 
+    def connection(self):
+        """The calling thread's shared connection (autocommit); do not close it"""
+        return self.provider.connection()
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """Run statements in one transaction on the shared connection; nested calls join the outer one.
+        immediate=True takes the write lock up front (retried while locked), so a read can never
+        turn into a write that deadlocks against another writer."""
+        db_conn = self.connection()
+        if db_conn.in_transaction:
+            yield db_conn
+            return
+        begin = "BEGIN IMMEDIATE" if immediate else "BEGIN"
+        retry_locked(lambda: db_conn.execute(begin))
+        try:
+            yield db_conn
+        except BaseException:
+            if db_conn.in_transaction:
+                db_conn.rollback()
+            raise
+        else:
+            db_conn.commit()
+
     def db_info(self):
         db_conn = None
 
         try:
-            with self.db_connect() as db_conn:
+            with self.transaction() as db_conn:
                 cursor = db_conn.cursor()
 
                 cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
@@ -57,11 +199,7 @@ class db_manager():
         db_conn = None
 
         try:
-            with self.db_connect() as db_conn:
-                cursor = db_conn.cursor()
-                cursor.execute(query)
-                result = cursor.fetchall()
-                cursor.close()
+            result = self._execute(query)
 
         except Exception as e:
             print(f"Error querying the database: {e}")
@@ -73,12 +211,7 @@ class db_manager():
         db_conn = None
 
         try:
-            with self.db_connect() as db_conn:
-                cursor = db_conn.cursor()
-                cursor.execute(query, params)
-                result = cursor.fetchall()
-                db_conn.commit()
-                cursor.close()
+            result = self._execute(query, params)
 
         except Exception as e:
             print(f"Error executing parameterized query: {e}")
@@ -91,18 +224,30 @@ class db_manager():
         result = None
         
         try:
-            with self.db_connect() as db_conn:
-                cursor = db_conn.cursor()
-                cursor.execute(query)
-                result = cursor.fetchall()
-                cursor.close()
-                db_conn.commit()
+            result = self._execute(query)
         
         except Exception as e:
             print(f"Failed to insert: {e}")
 
         return result
 
+    def _execute(self, query, params=()):
+        """One statement in its own transaction; writes retry while the database is locked"""
+        is_read = query.lstrip().upper().startswith(("SELECT", "PRAGMA", "EXPLAIN"))
+
+        def run():
+            with self.transaction(immediate=not is_read) as db_conn:
+                cursor = db_conn.cursor()
+                cursor.execute(query, params)
+                result = cursor.fetchall()
+                cursor.close()
+            return result
+
+        if self.connection().in_transaction:
+            # Part of a caller's transaction: retrying just this statement would be wrong
+            return run()
+        return retry_locked(run)
+
     def db_backup(self, backup_dir) -> bool:
 
         backup_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Aggregation datapack generator
+Compiles an event JSON's aggregate objectives into a .mcfunction inside a local
+world datapack, so the framework can recalculate every online player's total
+with a single `function` command instead of players x objectives RCON calls.
+
+Only online players (@a) are recalculated by the function. Offline players keep
+the total from their last online pass, so the final pass of an event still uses
+the exact per-player RCON path.
+"""
+import json
+import os
+import re
+import sys
+from dotenv import load_dotenv
+
+load_dotenv()
+DATAPACK_PATH = os.getenv("DATAPACK_PATH")
+DATAPACK_NAMESPACE = os.getenv("DATAPACK_NAMESPACE", "smp_events")
+DATAPACK_PACK_FORMAT = int(os.getenv("DATAPACK_PACK_FORMAT", 48))
+# 1.21+ uses "function", older versions use "functions"
+DATAPACK_FUNCTION_DIR = os.getenv("DATAPACK_FUNCTION_DIR", "function")
+
+PACK_DESCRIPTION = "SMP Event Orchestrator generated functions"
+
+def is_enabled():
+    return bool(DATAPACK_PATH)
+
+def pack_root():
+    return os.path.join(DATAPACK_PATH, DATAPACK_NAMESPACE)
+
+def function_name(event_data):
+    """Resource path of the aggregation function for an event"""
+    objective = event_data["aggregate_objective"]
+    return "aggregate/" + re.sub(r"[^a-z0-9_.-]", "_", objective.lower())
+
+def function_id(event_data):
+    return f"{DATAPACK_NAMESPACE}:{function_name(event_data)}"
+
+def build_aggregate_function(event_data):
+    """Render the .mcfunction body for an event's aggregate objective"""
+    agg_obj = event_data["aggregate_objective"]
+    objectives = event_data["commands"]["aggregate"]
+
+    lines = [
+        f"# Generated from '{event_data.get('name', agg_obj)}' by SMP Event Orchestrator - do not edit",
+        f"execute as @a run scoreboard players set @s {agg_obj} 0",
+    ]
+    for objective in objectives:
+        lines.append(f"execute as @a run scoreboard players operation @s {agg_obj} += @s {objective}")
+    return "\n".join(lines) + "\n"
+
+def _write_if_changed(path, content):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            if f.read() == content:
+                return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return True
+
+def install_aggregate_function(event_data):
+    """Write the pack metadata and aggregation function; returns True if anything changed on disk"""
+    root = pack_root()
+    mcmeta = json.dumps({
+        "pack": {
+            "pack_format": DATAPACK_PACK_FORMAT,
+            "description": PACK_DESCRIPTION
+        }
+    }, indent=2) + "\n"
+
+    changed = _write_if_changed(os.path.join(root, "pack.mcmeta"), mcmeta)
+
+    function_path = os.path.join(
+        root, "data", DATAPACK_NAMESPACE, DATAPACK_FUNCTION_DIR, function_name(event_data) + ".mcfunction"
+    )
+    changed = _write_if_changed(function_path, build_aggregate_function(event_data)) or changed
+    return changed
+
+def reload_commands():
+    """Commands that make the server pick up a changed pack"""
+    return ["reload", f'datapack enable "file/{DATAPACK_NAMESPACE}"']
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python datapack_generator.py <event-json-path>")
+        sys.exit(1)
+    if not is_enabled():
+        print("DATAPACK_PATH is not set in .env")
+        sys.exit(1)
+
+    with open(sys.argv[1], "r") as f:
+        event = json.load(f)
+
+    changed = install_aggregate_function(event)
+    print(f"{'Wrote' if changed else 'Up to date'}: {function_id(event)} in {pack_root()}")
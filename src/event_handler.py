@@ -1,9 +1,16 @@
 #!/usr/bin/python3.12
+import heapq
 import json
 import os
 import subprocess
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import sql_calendar
+import schedule_events
+import event_series
+import task_scheduler
+import log_retention
 from dotenv import load_dotenv
 from datetime import datetime, timezone, timedelta
 
@@ -13,12 +20,23 @@ RESULTS_PATH = os.getenv("LOGS_PATH")
 BOT_PY_PATH = "./src/bot.py"
 RCON_FRAMEWORK_PATH = "./src/rcon_event_framework.py"
 
-TASK_CAPTURE_WINDOW = 30
 MIN_SLEEP_INTERVAL = 1
 MAX_SLEEP_INTERVAL = 120
-SLEEP_THRESHOLD = 240
 
-def send_discord_notification(action, unique_name, winners=None, score=None):
+# Tasks of different events run in parallel on this many threads; one event's tasks run one at a time
+TASK_WORKERS = max(1, int(os.getenv("TASK_WORKERS", 4)))
+# Seconds a task's bot or RCON framework process may run before it is killed,
+# with per-task overrides as "task_name=seconds;task_name=seconds"
+TASK_TIMEOUT_SECONDS = float(os.getenv("TASK_TIMEOUT_SECONDS", 900))
+TASK_TIMEOUTS = {
+    name.strip(): float(value)
+    for name, value in (item.split("=", 1) for item in os.getenv("TASK_TIMEOUTS", "").split(";") if "=" in item)
+}
+
+def task_timeout(task_name):
+    return TASK_TIMEOUTS.get(task_name, TASK_TIMEOUT_SECONDS)
+
+def send_discord_notification(action, unique_name, winners=None, score=None, timeout=None):
     cmd = ["python3", BOT_PY_PATH, action, unique_name]
     if action == "over":
         if winners is None:
@@ -29,14 +47,14 @@ def send_discord_notification(action, unique_name, winners=None, score=None):
         cmd.append(str(score))
     
     sql_calendar.log_message(f"Sending Discord notification: {' '.join(cmd)}")
-    subprocess.run(cmd)
+    subprocess.run(cmd, timeout=timeout)
 
-def call_rcon_framework(action, json_file, unique_name=None):
+def call_rcon_framework(action, json_file, unique_name=None, timeout=None):
     cmd = ["python3", RCON_FRAMEWORK_PATH, action, json_file]
     if unique_name:
         cmd.append(unique_name)
     sql_calendar.log_message(f"Calling RCON framework: {' '.join(cmd)}")
-    subprocess.run(cmd)
+    subprocess.run(cmd, timeout=timeout)
 
 def get_event_results(unique_event_name):
     winners = []
@@ -72,45 +90,55 @@ def execute_task(task):
     event_id = task['event_id']
     unique_name = task['unique_event_name']
     event_json = task['event_json']
+    timeout = task_timeout(task_name)
     
     sql_calendar.log_message(f"Executing task: {task_name} for event {event_id} ({unique_name})")
     
     try:
         # FIXED: Updated task names to match what schedule_events.py creates
         if task_name == 'discord_twentyfour_notify':
-            send_discord_notification("twenty_four", unique_name)
+            send_discord_notification("twenty_four", unique_name, timeout=timeout)
             sql_calendar.send_24h_notification(event_id)
             
         elif task_name == 'discord_thirty_notify':
-            send_discord_notification("thirty", unique_name)
+            send_discord_notification("thirty", unique_name, timeout=timeout)
             sql_calendar.send_30min_notification(event_id)
             
         elif task_name == 'discord_now_notify':
-            send_discord_notification("now", unique_name)
+            send_discord_notification("now", unique_name, timeout=timeout)
             sql_calendar.send_start_notification(event_id)
             
         elif task_name == 'discord_over_notify':
             winners, score = get_event_results(unique_name)
-            send_discord_notification("over", unique_name, winners=winners, score=score)
+            send_discord_notification("over", unique_name, winners=winners, score=score, timeout=timeout)
             sql_calendar.send_end_notification(event_id)
             
         elif task_name == 'server_start_event':
-            call_rcon_framework("start", event_json)
+            call_rcon_framework("start", event_json, timeout=timeout)
             sql_calendar.start_event_by_id(event_id)
             
         elif task_name == 'server_end_event':
-            call_rcon_framework("clean", event_json, unique_name)
+            call_rcon_framework("clean", event_json, unique_name, timeout=timeout)
             time.sleep(3)
             sql_calendar.end_event_by_id(event_id)
             
         # FIXED: Also fixing the scoreboard task name to match schedule_events.py  
         elif task_name == 'server_display_scoreboard' or task_name == 'server_scoreboard_display':
-            call_rcon_framework("display", event_json, unique_name)
+            call_rcon_framework("display", event_json, unique_name, timeout=timeout)
             sql_calendar.update_scoreboard_display_time(event_id)
+
+        elif task_name == 'server_clear_scoreboard':
+            call_rcon_framework("clear", event_json, unique_name, timeout=timeout)
             
         else:
             sql_calendar.log_message(f"Unknown task name: {task_name}", "ERROR")
             
+    except subprocess.TimeoutExpired:
+        sql_calendar.log_message(f"Task {task_name} for event {event_id} timed out after {timeout:.0f}s and was killed", "ERROR")
+        if task_name == 'server_end_event':
+            # A retry would run the ceremony and hand out rewards again, so end the event with the cleanup it got
+            sql_calendar.end_event_by_id(event_id)
+            sql_calendar.log_message(f"Event {event_id} ended after a partial cleanup; check for leftover objectives", "WARN")
     except Exception as e:
         sql_calendar.log_message(f"Error executing task {task_name}: {e}", "ERROR")
     
@@ -118,44 +146,138 @@ def execute_task(task):
     execution_length_ms = int((t_end - t_start) * 1000)
     sql_calendar.mark_task_completed(task['id'], execution_length_ms)
     sql_calendar.log_message(f"Task {task_name} completed in {execution_length_ms}ms")
+    
+    if task_name == schedule_events.SCOREBOARD_TASK_NAME or task_name == 'server_scoreboard_display':
+        # Only the next display exists as a row; queue the one after it now that this one is done
+        top_up_scoreboard(event_id)
+
+def top_up_scoreboard(event_id):
+    try:
+        schedule_events.top_up_scoreboard_tasks(event_id)
+    except Exception as e:
+        sql_calendar.log_message(f"Error scheduling next scoreboard display for event {event_id}: {e}", "ERROR")
+
+class task_executor():
+    """Runs due tasks on a thread pool: highest priority first, never two tasks of one event at once"""
+
+    def __init__(self, run, workers=TASK_WORKERS, on_done=None):
+        self.run = run
+        self.workers = workers
+        self.on_done = on_done
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="task")
+        self._ready = []
+        self._queued = set()
+        self._busy_events = set()
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def submit(self, task):
+        """Queue a due task; a task already queued or running is ignored"""
+        with self._lock:
+            if task['id'] in self._queued:
+                return False
+            self._queued.add(task['id'])
+            heapq.heappush(self._ready, (-task['priority'], task['scheduled_time'], task['id'], task))
+            self._dispatch()
+        return True
+
+    def _dispatch(self):
+        # Caller holds the lock. Tasks whose event is busy stay queued until it finishes.
+        waiting = []
+        while self._ready and self._running < self.workers:
+            entry = heapq.heappop(self._ready)
+            task = entry[3]
+            if task['event_id'] in self._busy_events:
+                waiting.append(entry)
+                continue
+            self._busy_events.add(task['event_id'])
+            self._running += 1
+            self._pool.submit(self._run_one, task)
+        for entry in waiting:
+            heapq.heappush(self._ready, entry)
+
+    def _run_one(self, task):
+        try:
+            # The scheduler may hand over a stale copy of a task that already ran or was deleted
+            if sql_calendar.is_task_pending(task['id']):
+                self.run(task)
+        except Exception as e:
+            sql_calendar.log_message(f"Error running task {task['id']} ({task['task_name']}): {e}", "ERROR")
+        finally:
+            with self._lock:
+                self._busy_events.discard(task['event_id'])
+                self._running -= 1
+                self._queued.discard(task['id'])
+                self._dispatch()
+            if self.on_done:
+                self.on_done()
+
+def run_log_retention():
+    try:
+        archived, files, more = log_retention.prune_logs(sql_calendar.DATABASE_PATH)
+        if archived:
+            sql_calendar.log_message(
+                f"Archived {archived} log rows to {', '.join(files)}" + (" (more pending)" if more else "")
+            )
+        return more
+    except Exception as e:
+        sql_calendar.log_message(f"Log retention failed: {e}", "ERROR")
+        return False
+
+def run_series_materialization():
+    try:
+        created = event_series.materialize_all()
+        if created:
+            sql_calendar.log_message(f"Scheduled {created} event(s) from recurring series")
+    except Exception as e:
+        sql_calendar.log_message(f"Recurring series materialization failed: {e}", "ERROR")
 
 def task_execution_loop():
     sql_calendar.log_message("Task execution loop starting")
+    last_retention = None
+    last_materialization = None
+    scheduler = task_scheduler.task_scheduler(sql_calendar.DATABASE_PATH)
+    executor = task_executor(execute_task, on_done=scheduler.wake)
     
     while True:
         try:
-            current_time = datetime.now(timezone.utc)
+            if last_retention is None or time.monotonic() - last_retention >= log_retention.LOG_RETENTION_INTERVAL:
+                # A backlog keeps being worked off a few batches per loop iteration
+                last_retention = None if run_log_retention() else time.monotonic()
             
-            tasks = sql_calendar.get_tasks_to_execute(current_time, TASK_CAPTURE_WINDOW)
+            if last_materialization is None or time.monotonic() - last_materialization >= event_series.SERIES_MATERIALIZE_INTERVAL:
+                run_series_materialization()
+                last_materialization = time.monotonic()
             
-            for task in tasks:
-                if task['scheduled_time'] <= current_time:
-                    execute_task(task)
+            if scheduler.refresh():
+                sql_calendar.log_message(f"Loaded {len(scheduler)} pending task(s)", "DEBUG")
             
-            next_task_time = sql_calendar.get_next_pending_task_time()
+            for task in scheduler.pop_due(datetime.now(timezone.utc)):
+                executor.submit(task)
             
+            # Sleep until the next task or housekeeping is due; a task added, deleted or
+            # rescheduled by any process ends the wait within SCHEDULER_WAKE_POLL seconds
+            timeouts = [MAX_SLEEP_INTERVAL]
+            next_task_time = scheduler.next_time()
             if next_task_time:
-                time_until_next = (next_task_time - datetime.now(timezone.utc)).total_seconds()
-                
-                if time_until_next <= SLEEP_THRESHOLD:
-                    sleep_duration = MIN_SLEEP_INTERVAL
-                else:
-                    sleep_duration = min(MAX_SLEEP_INTERVAL, max(MIN_SLEEP_INTERVAL, time_until_next / 2))
-                
-                sql_calendar.log_message(f"Next task in {time_until_next:.0f}s, sleeping for {sleep_duration}s")
-            else:
-                sleep_duration = MAX_SLEEP_INTERVAL
-                sql_calendar.log_message(f"No pending tasks, sleeping for {sleep_duration}s")
-            
-            time.sleep(sleep_duration)
+                timeouts.append((next_task_time - datetime.now(timezone.utc)).total_seconds())
+            for last, interval in ((last_retention, log_retention.LOG_RETENTION_INTERVAL),
+                                   (last_materialization, event_series.SERIES_MATERIALIZE_INTERVAL)):
+                timeouts.append(0 if last is None else last + interval - time.monotonic())
+            scheduler.wait(max(0, min(timeouts)))
             
         except Exception as e:
             error_msg = f"Error in task execution loop: {e}"
             sql_calendar.log_message(error_msg, "ERROR")
+            # Tasks popped before the error are still pending in the database; the executor skips any already queued
+            scheduler.invalidate()
             time.sleep(MIN_SLEEP_INTERVAL)
 
 def main():
     sql_calendar.log_message("Event handler (task-based) starting up")
+    # Covers a display that ran but was not followed up before a restart
+    for event_id in sql_calendar.get_unfinished_event_ids():
+        top_up_scoreboard(event_id)
     task_execution_loop()
 
 if __name__ == "__main__":
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Recurring event series
+A series is one event_series row: the first start as wall-clock time in its own
+timezone, a duration, and a daily or weekly rule (every interval_count days or
+weeks, optionally capped by a count or an end date). Occurrence k starts k steps
+after the first in local time, so an 8 PM event stays at 8 PM across DST. Only
+occurrences starting within SERIES_HORIZON_DAYS are written to events and
+event_tasks; next_occurrence records how far each series has got, so a year of
+weekly events is a single row until each one comes within reach.
+"""
+import math
+import os
+from datetime import datetime, timedelta
+import pytz
+from dotenv import load_dotenv
+import sql_calendar
+import schedule_events
+
+load_dotenv()
+# Events materialized less than 24 hours ahead miss their 24-hour Discord notification
+SERIES_HORIZON_DAYS = max(2.0, float(os.getenv("SERIES_HORIZON_DAYS", 14)))
+SERIES_MATERIALIZE_INTERVAL = float(os.getenv("SERIES_MATERIALIZE_INTERVAL", 3600))
+
+FREQUENCY_DAYS = {"daily": 1, "weekly": 7}
+LOCAL_FORMAT = '%Y-%m-%dT%H:%M:%S'
+UTC_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+def step_days(series):
+    return FREQUENCY_DAYS[series["frequency"]] * max(1, int(series["interval_count"] or 1))
+
+def occurrence_start(series, k):
+    """UTC start of occurrence k (k = 0 is the first)"""
+    tz = pytz.timezone(series["timezone"])
+    local = datetime.strptime(series["first_start"], LOCAL_FORMAT) + timedelta(days=k * step_days(series))
+    # normalize() moves a start inside a spring-forward gap to the first valid time
+    return tz.normalize(tz.localize(local)).astimezone(pytz.UTC)
+
+def first_unfinished(series, now):
+    """An occurrence index at or before the first one still running at now; skips a long-dormant series in O(1)"""
+    elapsed = now - timedelta(seconds=series["duration_seconds"]) - occurrence_start(series, 0)
+    # One step of slack for the DST offset between the first occurrence and now
+    return max(0, math.floor(elapsed / timedelta(days=step_days(series))) - 1)
+
+def occurrences(series, start_index, latest_start):
+    """(k, start) for occurrences from start_index that start no later than latest_start and are inside the rule"""
+    limit = series["occurrence_limit"]
+    until = series["until_time"]
+    k = start_index
+    while limit is None or k < limit:
+        start = occurrence_start(series, k)
+        if start > latest_start or (until and start.strftime(UTC_FORMAT) > until):
+            return
+        yield k, start
+        k += 1
+
+def materialize_series(series_id, now=None, horizon_days=SERIES_HORIZON_DAYS):
+    """Create the series' events that start within the horizon; returns how many were created"""
+    now = now or datetime.now(pytz.UTC)
+    created = 0
+    # Read and advance the cursor in one write transaction, so two processes cannot create the same occurrence
+    with sql_calendar.get_db().transaction(immediate=True):
+        series = sql_calendar.get_series(series_id)
+        if series is None:
+            return 0
+        next_occurrence = max(series["next_occurrence"], first_unfinished(series, now))
+        for k, start in occurrences(series, next_occurrence, now + timedelta(days=horizon_days)):
+            next_occurrence = k + 1
+            end = start + timedelta(seconds=series["duration_seconds"])
+            if end <= now:
+                # Passed while nothing was running; occurrences are never created after the fact
+                continue
+            unique_name = schedule_events.unique_event_name(series["name"], start)
+            if sql_calendar.get_event_id_by_unique_name(unique_name):
+                # Most likely the same event created by hand; a second copy would share its objectives
+                sql_calendar.log_message(f"Series {series_id} ({series['name']}) skipped {unique_name}: "
+                                         f"an event with that name already exists", "WARN")
+                continue
+            interval = series["scoreboard_interval"]
+            sql_calendar.insert_event_with_tasks(
+                unique_name, series["name"], series["event_json"],
+                series["description"], start.strftime(UTC_FORMAT), end.strftime(UTC_FORMAT), interval,
+                schedule_events.build_tasks(start, end, interval, now), series_id=series_id
+            )
+            created += 1
+        if next_occurrence != series["next_occurrence"]:
+            sql_calendar.set_series_next_occurrence(series_id, next_occurrence)
+    return created
+
+def materialize_all(now=None):
+    """materialize_series for every series; returns the total number of events created"""
+    total = 0
+    for series in sql_calendar.get_all_series():
+        try:
+            total += materialize_series(series["id"], now)
+        except Exception as e:
+            sql_calendar.log_message(f"Error materializing series {series['id']} ({series['name']}): {e}", "ERROR")
+    return total
+
+def create_series(name, event_json, description, timezone_name, first_start_local, duration_seconds, frequency,
+                  interval_count=1, occurrence_limit=None, until_time=None,
+                  scoreboard_interval=schedule_events.DEFAULT_SCOREBOARD_INTERVAL):
+    """Store a recurrence rule and materialize its first occurrences; returns (series id, events created).
+    first_start_local is a naive datetime in timezone_name; until_time is an aware datetime or None."""
+    if frequency not in FREQUENCY_DAYS:
+        raise ValueError(f"Unknown frequency '{frequency}', expected one of {', '.join(FREQUENCY_DAYS)}")
+    if timezone_name not in pytz.all_timezones:
+        raise ValueError(f"Unknown timezone '{timezone_name}'")
+    if duration_seconds <= 0:
+        raise ValueError("Event duration must be positive")
+    if int(interval_count) < 1 or (occurrence_limit is not None and int(occurrence_limit) < 1):
+        raise ValueError("Repeat interval and occurrence count must be at least 1")
+
+    series_id = sql_calendar.insert_series(
+        name, event_json, description, timezone_name, first_start_local.strftime(LOCAL_FORMAT),
+        int(duration_seconds), frequency, int(interval_count),
+        int(occurrence_limit) if occurrence_limit is not None else None,
+        until_time.astimezone(pytz.UTC).strftime(UTC_FORMAT) if until_time else None,
+        scoreboard_interval
+    )
+    created = materialize_series(series_id)
+    sql_calendar.log_message(f"Created {frequency} series '{name}' ({series_id}); {created} event(s) scheduled so far")
+    return series_id, created
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Log verbosity policy
+Every log row has a level; rows below the threshold of the module that wrote
+them are discarded before they reach the log writer. Thresholds come from
+LOG_LEVEL and from per-module rows in the log_settings table (module 'default'
+overrides LOG_LEVEL), which are re-read every LOG_POLICY_TTL seconds so the
+options page can change them without a restart.
+"""
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+import database_manager
+
+load_dotenv()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_POLICY_TTL = float(os.getenv("LOG_POLICY_TTL", 10))
+LOG_SUMMARY_INTERVAL = float(os.getenv("LOG_SUMMARY_INTERVAL", 10))
+
+DEFAULT_MODULE = "default"
+LEVELS = ("TRACE", "DEBUG", "INFO", "WARN", "ERROR")
+LEVEL_RANKS = {name: rank for rank, name in enumerate(LEVELS)}
+# Levels outside the threshold scale; ADMIN rows record operator actions and are always kept
+LEVEL_RANKS.update({"WARNING": LEVEL_RANKS["WARN"], "ADMIN": len(LEVELS)})
+# Modules that log through sql_calendar, offered on the options page
+KNOWN_MODULES = ("rcon_event_framework", "event_handler", "schedule_events", "event_series", "bot", "app")
+
+def level_rank(level):
+    """Rank of a level name; unknown names rank as INFO"""
+    return LEVEL_RANKS.get(str(level).upper(), LEVEL_RANKS["INFO"])
+
+def normalize_level(level):
+    level = str(level).upper()
+    return level if level in LEVELS else None
+
+class log_policy():
+
+    def __init__(self, database_path, default_level=LOG_LEVEL, ttl=LOG_POLICY_TTL):
+        self.database_path = database_path
+        self.default_level = normalize_level(default_level) or "INFO"
+        self.ttl = ttl
+        self._overrides = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def threshold(self, module=None):
+        overrides = self.overrides()
+        if module and module in overrides:
+            return overrides[module]
+        return overrides.get(DEFAULT_MODULE, self.default_level)
+
+    def enabled(self, level, module=None):
+        """True if a row at this level from this module should be written"""
+        return level_rank(level) >= LEVEL_RANKS[self.threshold(module)]
+
+    def overrides(self):
+        """Per-module thresholds from log_settings, cached for ttl seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if self._loaded_at is None or now - self._loaded_at >= self.ttl:
+                self._overrides = self._load()
+                self._loaded_at = now
+            return self._overrides
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _load(self):
+        try:
+            db_conn = database_manager.open_connection(self.database_path)
+            try:
+                rows = db_conn.execute("SELECT module, level FROM log_settings").fetchall()
+            finally:
+                db_conn.close()
+        except sqlite3.Error:
+            # Databases created before log_settings existed just use LOG_LEVEL
+            return {}
+        return {module: normalize_level(level) for module, level in rows if normalize_level(level)}
+
+class log_summary():
+    """Rolls a repetitive message up into one row per interval, e.g. 'Executed 2,100 RCON commands in 1.3s'"""
+
+    def __init__(self, emit, template, interval=LOG_SUMMARY_INTERVAL):
+        self.emit = emit
+        self.template = template
+        self.interval = interval
+        self._count = 0
+        self._seconds = 0.0
+        self._window_start = None
+        self._lock = threading.Lock()
+
+    def add(self, count=1, seconds=0.0):
+        with self._lock:
+            if self._window_start is None:
+                self._window_start = time.monotonic()
+            self._count += count
+            self._seconds += seconds
+            due = time.monotonic() - self._window_start >= self.interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            count, seconds = self._count, self._seconds
+            self._count, self._seconds, self._window_start = 0, 0.0, None
+        if count:
+            self.emit(self.template.format(count=count, seconds=seconds))
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+def get_policy(database_path):
+    with _policies_lock:
+        policy = _policies.get(database_path)
+        if policy is None:
+            policy = log_policy(database_path)
+            _policies[database_path] = policy
+        return policy
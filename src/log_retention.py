@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Log retention and archival
+Rows older than LOG_RETENTION_DAYS, and the oldest rows beyond LOG_MAX_ROWS,
+are moved out of the logs table in batches of LOG_RETENTION_BATCH. Each batch is
+appended as a gzip member to a per-day NDJSON archive (logs-YYYY-MM-DD.ndjson.gz)
+before it is deleted, so a crash in between can duplicate archived rows (they
+keep their id) but never lose them. The event handler runs a few batches every
+LOG_RETENTION_INTERVAL seconds; run this file directly to catch up in one go.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timezone, timedelta
+from dotenv import load_dotenv
+import database_manager
+
+load_dotenv()
+LOG_RETENTION_DAYS = float(os.getenv("LOG_RETENTION_DAYS", 30))
+LOG_MAX_ROWS = int(os.getenv("LOG_MAX_ROWS", 200000))
+LOG_RETENTION_BATCH = max(1, int(os.getenv("LOG_RETENTION_BATCH", 1000)))
+LOG_RETENTION_MAX_BATCHES = max(1, int(os.getenv("LOG_RETENTION_MAX_BATCHES", 10)))
+LOG_RETENTION_INTERVAL = float(os.getenv("LOG_RETENTION_INTERVAL", 300))
+LOG_ARCHIVE_PATH = os.getenv("LOG_ARCHIVE_PATH") or os.path.join(os.getenv("LOGS_PATH") or "./logs/", "archive")
+
+def archive_file(archive_dir, timestamp):
+    day = (timestamp or "unknown")[:10]
+    return os.path.join(archive_dir, f"logs-{day}.ndjson.gz")
+
+def archive_rows(rows, archive_dir):
+    """Append rows to their day's archive and fsync; returns the files written"""
+    by_file = {}
+    for row in rows:
+        by_file.setdefault(archive_file(archive_dir, row[1]), []).append(row)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    for path, file_rows in by_file.items():
+        lines = "".join(
+            json.dumps({"id": row_id, "timestamp": timestamp, "message": message, "log_level": level}) + "\n"
+            for row_id, timestamp, message, level in file_rows
+        )
+        # Appending starts a new gzip member; gzip readers treat concatenated members as one stream
+        with open(path, "ab") as f:
+            with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+                gz.write(lines.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+    return sorted(by_file)
+
+def select_batch(db_conn, cutoff, excess, batch_size):
+    """Oldest rows that are expired or over the row cap, in idx_logs_timestamp order"""
+    query = "SELECT id, timestamp, message, log_level FROM logs ORDER BY timestamp, id LIMIT ?"
+    rows = db_conn.execute(query, (batch_size,)).fetchall()
+    return [
+        row for position, row in enumerate(rows)
+        if position < excess or (cutoff is not None and (row[1] or "") < cutoff)
+    ]
+
+def delete_rows(db_conn, rows):
+    with db_conn:
+        db_conn.executemany("DELETE FROM logs WHERE id = ?", [(row[0],) for row in rows])
+
+def prune_logs(database_path, archive_dir=LOG_ARCHIVE_PATH, retention_days=LOG_RETENTION_DAYS,
+               max_rows=LOG_MAX_ROWS, batch_size=LOG_RETENTION_BATCH, max_batches=LOG_RETENTION_MAX_BATCHES):
+    """Archive and delete up to max_batches batches; returns (rows archived, files touched, more left)"""
+    cutoff = None
+    if retention_days and retention_days > 0:
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    archived = 0
+    files = set()
+    db_conn = database_manager.open_connection(database_path)
+    try:
+        excess = 0
+        if max_rows and max_rows > 0:
+            excess = max(0, db_conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0] - max_rows)
+
+        for _ in range(max_batches):
+            rows = select_batch(db_conn, cutoff, excess, batch_size)
+            if not rows:
+                return archived, sorted(files), False
+            files.update(archive_rows(rows, archive_dir))
+            database_manager.retry_locked(lambda: delete_rows(db_conn, rows))
+            archived += len(rows)
+            excess = max(0, excess - len(rows))
+            if len(rows) < batch_size and excess == 0:
+                return archived, sorted(files), False
+        return archived, sorted(files), True
+    finally:
+        db_conn.close()
+
+def read_archive(path):
+    """Yield the rows of one archive file as dicts"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+if __name__ == "__main__":
+    import sql_calendar
+
+    total = 0
+    more = True
+    while more:
+        archived, files, more = prune_logs(sql_calendar.DATABASE_PATH)
+        total += archived
+    print(f"Archived {total} log rows to {LOG_ARCHIVE_PATH}")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Full-text search over the logs table
+logs_fts is an external-content FTS5 index on logs.message, kept in step by
+triggers, so it covers rows from every writer and drops rows that retention
+deletes. Results are newest first and paged by id (keyset), so every page is
+an index range scan however deep it is. SQLite builds without FTS5 fall back
+to LIKE, which is correct but scans.
+"""
+import re
+import sqlite3
+import threading
+import database_manager
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(message, content='logs', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+        INSERT INTO logs_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+        INSERT INTO logs_fts(logs_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS logs_fts_update AFTER UPDATE OF message ON logs BEGIN
+        INSERT INTO logs_fts(logs_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO logs_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+)
+
+_checked = {}
+_checked_lock = threading.Lock()
+
+def ensure_index(db_conn):
+    """Create logs_fts and its triggers if missing; returns False when FTS5 is unavailable"""
+    exists = db_conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='logs_fts'"
+    ).fetchone()
+    try:
+        with db_conn:
+            for statement in FTS_SCHEMA:
+                db_conn.execute(statement)
+            if not exists:
+                # Index the rows written before the triggers existed
+                db_conn.execute("INSERT INTO logs_fts(logs_fts) VALUES ('rebuild')")
+    except sqlite3.OperationalError as e:
+        if "fts5" in str(e).lower():
+            return False
+        raise
+    return True
+
+def fts_available(database_path):
+    """ensure_index once per process and database"""
+    with _checked_lock:
+        if database_path not in _checked:
+            db_conn = database_manager.open_connection(database_path)
+            try:
+                _checked[database_path] = ensure_index(db_conn)
+            finally:
+                db_conn.close()
+        return _checked[database_path]
+
+def terms(text):
+    """Split user input into words; a trailing * keeps prefix matching"""
+    return [term for term in re.findall(r'[^\s"]+', text or "") if term.strip("*")]
+
+def fts_query(words):
+    """Quote every word so FTS5 operators in user input are matched literally"""
+    parts = []
+    for word in words:
+        prefix = word.endswith("*")
+        quoted = '"' + word.rstrip("*").replace('"', '""') + '"'
+        parts.append(quoted + ("*" if prefix else ""))
+    return " ".join(parts)
+
+def search(database_path, text=None, levels=None, since=None, until=None, before_id=None, limit=DEFAULT_LIMIT):
+    """Newest-first matching rows plus the cursor for the next page"""
+    limit = max(1, min(int(limit or DEFAULT_LIMIT), MAX_LIMIT))
+    words = terms(text)
+    use_fts = bool(words) and fts_available(database_path)
+
+    clauses = []
+    params = []
+    if use_fts:
+        source = "logs_fts JOIN logs ON logs.id = logs_fts.rowid"
+        clauses.append("logs_fts MATCH ?")
+        params.append(fts_query(words))
+        id_column = "logs_fts.rowid"
+    else:
+        source = "logs"
+        id_column = "logs.id"
+        for word in words:
+            clauses.append("logs.message LIKE ? ESCAPE '\\'")
+            escaped = word.rstrip("*").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+    if before_id:
+        clauses.append(f"{id_column} < ?")
+        params.append(int(before_id))
+    if levels:
+        clauses.append(f"logs.log_level IN ({', '.join('?' for _ in levels)})")
+        params.extend(level.upper() for level in levels)
+    if since:
+        clauses.append("logs.timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("logs.timestamp <= ?")
+        params.append(until)
+
+    query = (
+        f"SELECT logs.id, logs.timestamp, logs.message, logs.log_level FROM {source}"
+        + (f" WHERE {' AND '.join(clauses)}" if clauses else "")
+        + f" ORDER BY {id_column} DESC LIMIT ?"
+    )
+    params.append(limit + 1)
+
+    db_conn = database_manager.open_connection(database_path)
+    try:
+        rows = db_conn.execute(query, params).fetchall()
+    finally:
+        db_conn.close()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "results": [
+            {"id": row[0], "timestamp": row[1], "message": row[2], "log_level": row[3]}
+            for row in rows
+        ],
+        "next_cursor": rows[-1][0] if more else None,
+        "engine": "fts5" if use_fts else "like"
+    }
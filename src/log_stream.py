@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Live log tail for Server-Sent Events
+One tailer thread per web worker watches PRAGMA data_version, reads only rows
+with an id above the last one it has seen, and fans them out to every
+connected dashboard. The SSE id of each event is the log row id, so a
+reconnecting EventSource resumes from Last-Event-ID without repeats (and
+without gaps unless it missed more than LOG_STREAM_QUEUE rows).
+"""
+import json
+import os
+import queue
+import threading
+import time
+from dotenv import load_dotenv
+import database_manager
+
+load_dotenv()
+LOG_STREAM_INTERVAL = float(os.getenv("LOG_STREAM_INTERVAL", 0.5))
+LOG_STREAM_BACKLOG = int(os.getenv("LOG_STREAM_BACKLOG", 100))
+LOG_STREAM_HEARTBEAT = float(os.getenv("LOG_STREAM_HEARTBEAT", 15))
+# Streams are closed after this long so a gthread worker's threads are never held forever;
+# the browser reconnects with Last-Event-ID and misses nothing
+LOG_STREAM_MAX_SECONDS = float(os.getenv("LOG_STREAM_MAX_SECONDS", 300))
+LOG_STREAM_QUEUE = 1000
+FETCH_LIMIT = 500
+RECONNECT_MS = 2000
+
+SELECT_AFTER_QUERY = "SELECT id, timestamp, message, log_level FROM logs WHERE id > ? ORDER BY id LIMIT ?"
+
+def row_dict(row):
+    return {"id": row[0], "timestamp": row[1], "message": row[2], "log_level": row[3]}
+
+class log_tail():
+
+    def __init__(self, database_path, interval=LOG_STREAM_INTERVAL):
+        self.database_path = database_path
+        self.interval = interval
+        self.stats = {"polls": 0, "fetches": 0, "rows": 0, "overflows": 0}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self):
+        """Queue of new row dicts; None in the queue means the subscriber fell behind"""
+        subscriber = queue.Queue(maxsize=LOG_STREAM_QUEUE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                # Read the starting id before the caller reads its backlog, so no row falls in between
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._max_id(),), name="log-tail", daemon=True
+                )
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _max_id(self):
+        db_conn = database_manager.open_connection(self.database_path)
+        try:
+            return db_conn.execute("SELECT COALESCE(MAX(id), 0) FROM logs").fetchone()[0]
+        finally:
+            db_conn.close()
+
+    def _run(self, last_id):
+        db_conn = database_manager.open_connection(self.database_path)
+        try:
+            last_version = None
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        self._thread = None
+                        return
+                self.stats["polls"] += 1
+                # data_version only changes when another connection commits, so idle polls read no rows
+                version = db_conn.execute("PRAGMA data_version").fetchone()[0]
+                if version != last_version:
+                    last_version = version
+                    last_id = self._fetch(db_conn, last_id)
+                time.sleep(self.interval)
+        finally:
+            db_conn.close()
+
+    def _fetch(self, db_conn, last_id):
+        while True:
+            rows = db_conn.execute(SELECT_AFTER_QUERY, (last_id, FETCH_LIMIT)).fetchall()
+            if not rows:
+                return last_id
+            self.stats["fetches"] += 1
+            self.stats["rows"] += len(rows)
+            last_id = rows[-1][0]
+            self._publish([row_dict(row) for row in rows])
+            if len(rows) < FETCH_LIMIT:
+                return last_id
+
+    def _publish(self, entries):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                for entry in entries:
+                    subscriber.put_nowait(entry)
+            except queue.Full:
+                # A stalled client is cut off; it reconnects and catches up from the database
+                self.stats["overflows"] += 1
+                self.unsubscribe(subscriber)
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(None)
+
+def backlog(database_path, after_id=None, limit=LOG_STREAM_BACKLOG):
+    """Newest rows after after_id, oldest first; a reconnect gets up to LOG_STREAM_QUEUE rows"""
+    if after_id is not None:
+        limit = LOG_STREAM_QUEUE
+    db_conn = database_manager.open_connection(database_path)
+    try:
+        rows = db_conn.execute(
+            "SELECT id, timestamp, message, log_level FROM logs WHERE id > ? ORDER BY id DESC LIMIT ?",
+            (after_id or 0, limit)
+        ).fetchall()
+    finally:
+        db_conn.close()
+    rows.reverse()
+    return [row_dict(row) for row in rows]
+
+def format_event(entry):
+    return f"id: {entry['id']}\nevent: log\ndata: {json.dumps(entry)}\n\n"
+
+def sse_events(database_path, last_event_id=None, max_seconds=LOG_STREAM_MAX_SECONDS):
+    """Generator of SSE frames: the backlog, then new rows as they are committed"""
+    tail = get_tail(database_path)
+    subscriber = tail.subscribe()
+    try:
+        yield f"retry: {RECONNECT_MS}\n\n"
+        sent_id = last_event_id or 0
+        # Subscribed before reading the backlog, so rows committed in between arrive twice at worst
+        for entry in backlog(database_path, last_event_id):
+            sent_id = entry["id"]
+            yield format_event(entry)
+
+        deadline = time.monotonic() + max_seconds
+        last_write = time.monotonic()
+        while time.monotonic() < deadline:
+            try:
+                entry = subscriber.get(timeout=max(0.1, min(LOG_STREAM_HEARTBEAT, deadline - time.monotonic())))
+            except queue.Empty:
+                entry = False
+            if entry is None:
+                return
+            if entry and entry["id"] > sent_id:
+                sent_id = entry["id"]
+                last_write = time.monotonic()
+                yield format_event(entry)
+            elif time.monotonic() - last_write >= LOG_STREAM_HEARTBEAT:
+                # Comment line: keeps proxies from timing out and surfaces dead clients as write errors
+                last_write = time.monotonic()
+                yield ": keepalive\n\n"
+    finally:
+        tail.unsubscribe(subscriber)
+
+_tails = {}
+_tails_lock = threading.Lock()
+
+def get_tail(database_path):
+    with _tails_lock:
+        tail = _tails.get(database_path)
+        if tail is None:
+            tail = log_tail(database_path)
+            _tails[database_path] = tail
+        return tail
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Buffered background log writer
+sql_calendar.log_message rows are queued here and a daemon thread writes them
+in one transaction per flush interval or batch. The buffer is bounded: when it
+is full new rows are dropped and counted, and the count is logged as a WARN row
+by the next flush. Queued rows are flushed at exit and on SIGTERM.
+"""
+import atexit
+import collections
+import os
+import signal
+import sys
+import threading
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+import database_manager
+
+load_dotenv()
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", 0.5))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", 200))
+LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", 10000))
+
+INSERT_LOG_QUERY = "INSERT INTO logs (timestamp, message, log_level) VALUES (?, ?, ?)"
+
+class log_writer():
+
+    def __init__(self, database_path, flush_interval=LOG_FLUSH_INTERVAL, batch_size=LOG_BATCH_SIZE,
+                 max_buffer=LOG_BUFFER_SIZE):
+        self.database_path = database_path
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.max_buffer = max(self.batch_size, max_buffer)
+        self.stats = {"written": 0, "flushes": 0, "dropped": 0, "failed": 0}
+        self._buffer = collections.deque()
+        self._dropped = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._conn = None
+        self._thread = None
+        self._closed = False
+        self._pid = os.getpid()
+
+    def write(self, message, level="INFO", timestamp=None):
+        """Queue one log row; returns False if the buffer was full and the row was dropped"""
+        if not timestamp:
+            timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        with self._cond:
+            self._check_fork()
+            if self._closed:
+                return self._write_now([(timestamp, message, level)])
+            if len(self._buffer) >= self.max_buffer:
+                self._dropped += 1
+                self.stats["dropped"] += 1
+                return False
+            self._buffer.append((timestamp, message, level))
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify_all()
+            self._ensure_thread()
+        return True
+
+    def flush(self):
+        """Write every queued row in one transaction"""
+        with self._flush_lock:
+            with self._cond:
+                rows = list(self._buffer)
+                self._buffer.clear()
+                dropped, self._dropped = self._dropped, 0
+            if dropped:
+                rows.append((
+                    datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    f"Log buffer full: dropped {dropped} log row(s)",
+                    "WARN"
+                ))
+            if rows:
+                self._write_now(rows)
+
+    def close(self):
+        """Stop the background thread and flush whatever is left"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _write_now(self, rows):
+        try:
+            if self._conn is None:
+                self._conn = database_manager.open_connection(self.database_path, check_same_thread=False)
+            database_manager.retry_locked(lambda: self._insert(rows))
+            self.stats["written"] += len(rows)
+            self.stats["flushes"] += 1
+            return True
+        except Exception as e:
+            self.stats["failed"] += len(rows)
+            print(f"Error writing {len(rows)} log rows: {e}", file=sys.stderr)
+            for timestamp, message, level in rows:
+                print(f"{timestamp} [{level}] {message}", file=sys.stderr)
+            return False
+
+    def _insert(self, rows):
+        with self._conn:
+            self._conn.executemany(INSERT_LOG_QUERY, rows)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def _check_fork(self):
+        # A forked child inherits the buffer but not the thread or a usable connection
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._buffer.clear()
+            self._dropped = 0
+            self._thread = None
+            self._conn = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buffer) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+_writers = {}
+_writers_lock = threading.Lock()
+_previous_sigterm = None
+
+def get_writer(database_path):
+    """Process-wide writer for a database, flushed at exit and on SIGTERM"""
+    with _writers_lock:
+        writer = _writers.get(database_path)
+        if writer is None:
+            writer = log_writer(database_path)
+            _writers[database_path] = writer
+            if len(_writers) == 1:
+                atexit.register(flush_all)
+                _install_sigterm_handler()
+        return writer
+
+def flush_all():
+    for writer in list(_writers.values()):
+        writer.close()
+
+def _install_sigterm_handler():
+    """Flush on SIGTERM, but only where nobody else (e.g. gunicorn) already handles it"""
+    global _previous_sigterm
+    if threading.current_thread() is not threading.main_thread():
+        return
+    if signal.getsignal(signal.SIGTERM) is not signal.SIG_DFL:
+        return
+    _previous_sigterm = signal.signal(signal.SIGTERM, _on_sigterm)
+
+def _on_sigterm(signum, frame):
+    flush_all()
+    signal.signal(signal.SIGTERM, _previous_sigterm or signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
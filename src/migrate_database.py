@@ -4,6 +4,8 @@ Database migration script to add event_tasks table and scoreboard_interval colum
 """
 import os
 import sqlite3
+import log_search
+import task_scheduler
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -63,6 +65,70 @@ def migrate_database():
         ADD COLUMN scoreboard_interval INTEGER DEFAULT 600
         """)
         print("scoreboard_interval column added successfully")
+
+    if 'last_scoreboard_seconds' not in columns:
+        print("Adding last_scoreboard_seconds column to events table...")
+        cursor.execute("""
+        ALTER TABLE events 
+        ADD COLUMN last_scoreboard_seconds INTEGER DEFAULT 0
+        """)
+        print("last_scoreboard_seconds column added successfully")
+    
+    if 'series_id' not in columns:
+        print("Adding series_id column to events table...")
+        cursor.execute("""
+        ALTER TABLE events 
+        ADD COLUMN series_id INTEGER NULL
+        """)
+        print("series_id column added successfully")
+    
+    # Check if event_series table exists
+    cursor.execute("""
+        SELECT name FROM sqlite_master 
+        WHERE type='table' AND name='event_series'
+    """)
+    
+    if not cursor.fetchone():
+        print("Creating event_series table...")
+        cursor.execute("""
+        CREATE TABLE event_series (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            event_json TEXT,
+            description TEXT,
+            timezone TEXT NOT NULL,
+            first_start TEXT NOT NULL,
+            duration_seconds INTEGER NOT NULL,
+            frequency TEXT NOT NULL CHECK (frequency IN ('daily', 'weekly')),
+            interval_count INTEGER NOT NULL DEFAULT 1,
+            occurrence_limit INTEGER NULL,
+            until_time TEXT NULL,
+            scoreboard_interval INTEGER DEFAULT 600,
+            next_occurrence INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now'))
+        )
+        """)
+        print("event_series table created successfully")
+    
+    # Check if log_settings table exists
+    cursor.execute("""
+        SELECT name FROM sqlite_master 
+        WHERE type='table' AND name='log_settings'
+    """)
+    
+    if not cursor.fetchone():
+        print("Creating log_settings table...")
+        cursor.execute("""
+        CREATE TABLE log_settings (
+            module TEXT PRIMARY KEY,
+            level TEXT NOT NULL CHECK (level IN ('TRACE', 'DEBUG', 'INFO', 'WARN', 'ERROR')),
+            updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now'))
+        )
+        """)
+        print("log_settings table created successfully")
+    
+    # Index so recent-log queries and log retention don't sort the whole table
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp)")
     
     # Add triggers for event_tasks if they don't exist
     cursor.execute("""
@@ -105,6 +171,17 @@ def migrate_database():
         print("Triggers created successfully")
     
     conn.commit()
+    
+    # Change counter the event handler watches to reload its task queue
+    task_scheduler.ensure_tracking(conn)
+    print("task_queue_version tracking is up to date")
+    
+    # Full-text index over logs (skipped on SQLite builds without FTS5)
+    if log_search.ensure_index(conn):
+        print("logs_fts index is up to date")
+    else:
+        print("SQLite has no FTS5 support; log search will use LIKE")
+    
     conn.close()
     print("Database migration completed successfully!")
     
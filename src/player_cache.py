@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Short-lived player list cache
+Holds the parsed tracked-player and online-player lists for the duration of one
+event action so repeated lookups don't cost another RCON round-trip.
+"""
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+PLAYER_CACHE_TTL = float(os.getenv("PLAYER_CACHE_TTL", 30))
+
+TRACKED = "tracked"
+ONLINE = "online"
+
+class ttl_cache():
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+_cache = ttl_cache(PLAYER_CACHE_TTL)
+
+def get(key):
+    return _cache.get(key)
+
+def put(key, value):
+    return _cache.put(key, value)
+
+def invalidate(key=None):
+    """Forget one cached list, or all of them"""
+    _cache.invalidate(key)
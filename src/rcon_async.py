@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Asyncio RCON client with pipelined requests
+Sends many command packets on one socket and matches replies by request ID.
+Fragmented replies are reassembled with the same sentinel technique as
+rcon_protocol.rcon_connection.
+A synchronous facade (execute_many) lets blocking code use it without a rewrite.
+
+Note: vanilla Minecraft's RCON reader expects exactly one packet per socket
+read, so only raise RCON_PIPELINE_DEPTH above 1 for servers that frame
+incoming RCON packets correctly.
+"""
+import asyncio
+import atexit
+import itertools
+import os
+import struct
+import threading
+import time
+from dotenv import load_dotenv
+import rcon_pool
+import rcon_rate_limiter
+import rcon_retry
+from rcon_protocol import (
+    encode_packet, split_packet, utf8_decoder, RconError, RconConnectionLost, RconUnavailable, RconAuthError,
+    SERVERDATA_AUTH, SERVERDATA_AUTH_RESPONSE, SERVERDATA_EXECCOMMAND, SERVERDATA_RESPONSE_VALUE,
+    PACKET_HEADER_SIZE, PACKET_PADDING, MAX_PACKET_SIZE, FRAGMENT_SIZE
+)
+
+load_dotenv()
+PIPELINE_DEPTH = int(os.getenv("RCON_PIPELINE_DEPTH", 1))
+
+class async_rcon_client():
+
+    def __init__(self, host, port, password, timeout=rcon_pool.RCON_TIMEOUT,
+                 command_timeout=rcon_pool.RCON_COMMAND_TIMEOUT, depth=PIPELINE_DEPTH):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.command_timeout = command_timeout or timeout
+        self.depth = max(1, depth)
+        self.reader = None
+        self.writer = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._sent_at = {}
+        # request_id -> (decoder, decoded chunks) for replies still arriving
+        self._partial = {}
+        # sentinel request_id -> request_id whose reply it terminates
+        self._sentinels = {}
+        self._reader_task = None
+        self._window = None
+        # Command packets handed to the socket; a batch that wrote none is safe to resend
+        self._writes = 0
+        self.stats = {"replies": 0, "fragmented_replies": 0, "fragments": 0}
+
+    @property
+    def connected(self):
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def connect(self):
+        """Open the socket, authenticate and start dispatching replies"""
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise RconUnavailable(f"Could not connect to {self.host}:{self.port}: {e}")
+
+        self._window = asyncio.Semaphore(self.depth)
+        auth_id = next(self._ids)
+        self.writer.write(encode_packet(auth_id, SERVERDATA_AUTH, self.password or ""))
+        await self.writer.drain()
+
+        while True:
+            request_id, packet_type, _ = await asyncio.wait_for(self._read_packet(), self.timeout)
+            if request_id == -1:
+                await self.close()
+                raise RconAuthError("RCON login failed")
+            if request_id == auth_id and packet_type == SERVERDATA_AUTH_RESPONSE:
+                break
+
+        self._reader_task = asyncio.get_running_loop().create_task(self._dispatch_replies())
+        return self
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.writer = None
+        self._fail_pending(RconConnectionLost("RCON client closed"))
+
+    async def _read_packet(self):
+        try:
+            header = await self.reader.readexactly(4)
+            (length,) = struct.unpack("<i", header)
+            if length < PACKET_HEADER_SIZE + len(PACKET_PADDING) or length > MAX_PACKET_SIZE:
+                raise RconError(f"Invalid RCON packet length: {length}")
+            return split_packet(await self.reader.readexactly(length))
+        except asyncio.IncompleteReadError:
+            raise RconConnectionLost("RCON connection closed by server")
+
+    async def _dispatch_replies(self):
+        try:
+            while True:
+                request_id, _, payload = await self._read_packet()
+                if request_id in self._sentinels:
+                    self._finish_reply(self._sentinels.pop(request_id))
+                    continue
+                if request_id not in self._pending:
+                    continue
+
+                self._observe_latency(request_id)
+                first = request_id not in self._partial
+                decoder, chunks = self._partial.setdefault(request_id, (utf8_decoder(), []))
+                chunks.append(decoder.decode(payload))
+                self.stats["fragments"] += 1
+
+                if not first:
+                    continue
+                if len(payload) < FRAGMENT_SIZE:
+                    self._finish_reply(request_id)
+                else:
+                    # Full-size fragment: the reply may continue, ask the server to mark its end
+                    sentinel_id = next(self._ids)
+                    self._sentinels[sentinel_id] = request_id
+                    self.writer.write(encode_packet(sentinel_id, SERVERDATA_RESPONSE_VALUE, ""))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail_pending(e if isinstance(e, RconError) else RconConnectionLost(str(e)))
+            if self.writer is not None:
+                self.writer.close()
+
+    def _finish_reply(self, request_id):
+        decoder, chunks = self._partial.pop(request_id)
+        chunks.append(decoder.decode(b"", final=True))
+        self.stats["replies"] += 1
+        if len(chunks) > 2:
+            self.stats["fragmented_replies"] += 1
+        future = self._pending.pop(request_id, None)
+        if future is not None and not future.done():
+            future.set_result("".join(chunks))
+
+    def _observe_latency(self, request_id):
+        sent_at = self._sent_at.pop(request_id, None)
+        limiter = rcon_rate_limiter.get_limiter()
+        if sent_at is not None and limiter is not None:
+            limiter.observe_latency(time.monotonic() - sent_at)
+
+    def _fail_pending(self, error):
+        self._sent_at.clear()
+        self._partial.clear()
+        self._sentinels.clear()
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def _throttle(self, priority):
+        limiter = rcon_rate_limiter.get_limiter()
+        if limiter is not None and not limiter.try_acquire(priority):
+            # Wait off the loop thread so replies keep being dispatched meanwhile
+            await asyncio.get_running_loop().run_in_executor(None, limiter.acquire, priority)
+
+    async def _send(self, cmd, priority=rcon_rate_limiter.PRIORITY_BULK):
+        await self._throttle(priority)
+        await asyncio.wait_for(self._window.acquire(), self.command_timeout)
+        if not self.connected:
+            self._window.release()
+            raise RconConnectionLost("RCON connection is closed")
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda _: self._window.release())
+        self._pending[request_id] = future
+        self._sent_at[request_id] = time.monotonic()
+        self._writes += 1
+        self.writer.write(encode_packet(request_id, SERVERDATA_EXECCOMMAND, cmd))
+        await self.writer.drain()
+        return future
+
+    async def execute(self, cmd, priority=rcon_rate_limiter.PRIORITY_BULK):
+        return (await self.execute_many([cmd], priority))[0]
+
+    async def execute_many(self, cmds, priority=rcon_rate_limiter.PRIORITY_BULK):
+        """Send every command without waiting in between and return replies in order"""
+        futures = []
+        results = []
+        writes_before = self._writes
+        try:
+            for cmd in cmds:
+                futures.append(await self._send(cmd, priority))
+            for future in futures:
+                results.append(await asyncio.wait_for(future, self.command_timeout))
+            return results
+        except RconConnectionLost as e:
+            # Any written packet may have run on the server, whether or not its reply arrived
+            e.sent = self._writes - writes_before
+            raise
+        except asyncio.TimeoutError:
+            await self.close()
+            raise RconError(f"RCON reply timed out after {self.command_timeout}s")
+        except (ConnectionError, OSError) as e:
+            await self.close()
+            lost = RconConnectionLost(f"RCON connection lost: {e}")
+            lost.sent = self._writes - writes_before
+            raise lost
+        finally:
+            for future in futures:
+                if not future.done():
+                    future.cancel()
+                elif not future.cancelled():
+                    # Failed with the connection but never awaited; mark it retrieved so asyncio stays quiet
+                    future.exception()
+
+# ---------------------------------------------------------------------------
+# Synchronous facade: one background event loop and one shared client per process
+# ---------------------------------------------------------------------------
+
+_loop = None
+_loop_lock = threading.Lock()
+_client = None
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="rcon-async", daemon=True).start()
+            atexit.register(_shutdown)
+        return _loop
+
+async def _connected_client():
+    global _client
+    if _client is None or not _client.connected:
+        client = async_rcon_client(rcon_pool.RCON_HOST, rcon_pool.RCON_PORT, rcon_pool.RCON_PASS)
+        await rcon_retry.connect_with_retry_async(client.connect, rcon_retry.get_breaker())
+        _client = client
+    return _client
+
+async def _execute_many(cmds, priority):
+    breaker = rcon_retry.get_breaker()
+    breaker.allow()
+    try:
+        results = await _send_batch(cmds, priority)
+    except Exception as e:
+        breaker.record_failure(e)
+        raise
+    breaker.record_success()
+    return results
+
+async def _send_batch(cmds, priority):
+    client = await _connected_client()
+    try:
+        return await client.execute_many(cmds, priority)
+    except RconConnectionLost as e:
+        # Only a batch that failed before its first packet was written is safe to resend
+        # (stale keep-alive socket); otherwise commands such as 'scoreboard players add' would run twice
+        if getattr(e, "sent", None) != 0:
+            raise
+        client = await _connected_client()
+        return await client.execute_many(cmds, priority)
+
+def execute_many(cmds, priority=rcon_rate_limiter.PRIORITY_BULK):
+    """Blocking wrapper around async_rcon_client.execute_many on the shared client"""
+    if isinstance(cmds, str):
+        cmds = [cmds]
+    if not cmds:
+        return []
+    return asyncio.run_coroutine_threadsafe(_execute_many(list(cmds), priority), _get_loop()).result()
+
+def _shutdown():
+    global _client
+    if _loop is None or not _loop.is_running():
+        return
+    if _client is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(_client.close(), _loop).result(timeout=2)
+        except Exception:
+            pass
+        _client = None
+    _loop.call_soon_threadsafe(_loop.stop)
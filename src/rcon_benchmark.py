@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+RCON throughput benchmark
+Runs the start, display and clean actions of rcon_event_framework against the
+local RCON simulator and records wall time, RCON round-trips, bytes on the
+wire, SQLite writes and peak RSS for every action. Results are written as JSON
+so runs can be compared between commits.
+
+Usage: python src/rcon_benchmark.py --players 10,100,1000,5000 --objectives 1,4 --output bench.json
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import runpy
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from datetime import datetime, timezone, timedelta
+import rcon_simulator
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SRC_DIR)
+FRAMEWORK_PATH = os.path.join(SRC_DIR, "rcon_event_framework.py")
+SCHEMA_PATH = os.path.join(REPO_DIR, "database", "init_schema.sql")
+
+ACTIONS = ("start", "display", "clean")
+BENCH_PASSWORD = "benchmark"
+BENCH_EVENT_FILE = "benchmark_event.json"
+BENCH_UNIQUE_NAME = "benchmark_event"
+
+def build_event(objective_count, sidebar_seconds):
+    """Synthetic event JSON; more than one objective makes it an aggregate event"""
+    objectives = [f"BenchStat{i}" for i in range(objective_count)]
+    is_aggregate = objective_count > 1
+    aggregate_objective = "BenchTotal" if is_aggregate else objectives[0]
+
+    setup = [f"scoreboard objectives add {objective} minecraft.custom:minecraft.jump" for objective in objectives]
+    if is_aggregate:
+        setup.append(f'scoreboard objectives add {aggregate_objective} dummy "Bench Total"')
+
+    return {
+        "name": "Benchmark Event",
+        "description": f"Synthetic event with {objective_count} objective(s)",
+        "is_aggregate": is_aggregate,
+        "score_text": "points",
+        "aggregate_objective": aggregate_objective,
+        "commands": {
+            "setup": setup,
+            "aggregate": objectives if is_aggregate else [],
+            "cleanup": objectives + ([aggregate_objective] if is_aggregate else [])
+        },
+        "sidebar": {
+            "displayName": "Benchmark",
+            "color": "gold",
+            "bold": True,
+            "duration": sidebar_seconds
+        },
+        "reward_cmd": "diamond",
+        "reward_name": "Diamond"
+    }
+
+def prepare_workspace(workdir, event):
+    """Fresh database with the benchmark event registered, plus its JSON file"""
+    events_dir = os.path.join(workdir, "events") + os.sep
+    os.makedirs(events_dir)
+    with open(os.path.join(events_dir, BENCH_EVENT_FILE), "w") as f:
+        json.dump(event, f)
+
+    now = datetime.now(timezone.utc)
+    db_conn = sqlite3.connect(os.path.join(workdir, "benchmark.db"))
+    with open(SCHEMA_PATH, "r") as f:
+        db_conn.executescript(f.read())
+    db_conn.execute(
+        "INSERT INTO events (unique_event_name, name, event_json, description, start_time, end_time) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (BENCH_UNIQUE_NAME, event["name"], BENCH_EVENT_FILE, event["description"],
+         now.strftime('%Y-%m-%dT%H:%M:%SZ'), (now + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M:%SZ'))
+    )
+    db_conn.commit()
+    db_conn.close()
+    return events_dir
+
+def child_env(workdir, events_dir, simulator, datapack_path):
+    env = dict(os.environ)
+    env.update({
+        "RCON_HOST": "127.0.0.1",
+        "RCON_PORT": str(simulator.port),
+        "RCON_PASS": BENCH_PASSWORD,
+        "DATABASE_DIR": workdir + os.sep,
+        "DATABASE_FILE": "benchmark.db",
+        "DATABASE_SCHEMA": "init_schema.sql",
+        "EVENTS_JSON_PATH": events_dir,
+        "RCON_LIMITER_STATE_FILE": os.path.join(workdir, "rcon_limiter_state.json"),
+        "DATAPACK_PATH": datapack_path or ""
+    })
+    return env
+
+def run_action(action, env, workdir, timeout):
+    """Run one framework action in a child process and measure it"""
+    counts_path = os.path.join(workdir, f"sqlite_{action}.json")
+    stderr_path = os.path.join(workdir, f"stderr_{action}.txt")
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", counts_path,
+           action, BENCH_EVENT_FILE, BENCH_UNIQUE_NAME]
+
+    started = time.perf_counter()
+    with open(stderr_path, "w") as stderr:
+        proc = subprocess.Popen(cmd, cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=stderr)
+        killer = threading.Timer(timeout, proc.kill)
+        killer.start()
+        try:
+            if hasattr(os, "wait4"):
+                _, status, usage = os.wait4(proc.pid, 0)
+                proc.returncode = os.waitstatus_to_exitcode(status)
+                peak_rss_kb = usage.ru_maxrss
+            else:
+                proc.wait()
+                peak_rss_kb = None
+        finally:
+            killer.cancel()
+    wall_seconds = time.perf_counter() - started
+
+    result = {
+        "action": action,
+        "exit_code": proc.returncode,
+        "wall_seconds": round(wall_seconds, 3),
+        "peak_rss_kb": peak_rss_kb
+    }
+    try:
+        with open(counts_path, "r") as f:
+            result.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    if proc.returncode != 0:
+        with open(stderr_path, "r") as f:
+            result["stderr_tail"] = f.read()[-2000:]
+    return result
+
+def run_case(players, objectives, args):
+    """Run the full start/display/clean lifecycle for one player/objective combination"""
+    with tempfile.TemporaryDirectory(prefix="rcon_bench_") as workdir:
+        datapack_path = None
+        if args.datapack:
+            datapack_path = os.path.join(workdir, "datapacks")
+            os.makedirs(datapack_path)
+
+        events_dir = prepare_workspace(workdir, build_event(objectives, args.sidebar_seconds))
+        simulator = rcon_simulator.build_simulator(
+            players=players, online=args.online, activity=args.activity, seed=args.seed,
+            datapack_path=datapack_path, password=BENCH_PASSWORD, latency_ms=args.latency_ms,
+            fragment_size=args.fragment_size
+        ).start()
+        env = child_env(workdir, events_dir, simulator, datapack_path)
+
+        results = []
+        try:
+            for action in ACTIONS:
+                simulator.reset_stats()
+                result = run_action(action, env, workdir, args.timeout)
+                stats = simulator.reset_stats()
+                result.update({
+                    "players": players,
+                    "objectives": objectives,
+                    "rcon_commands": stats.get("commands", 0),
+                    "rcon_packets_sent": stats.get("packets_in", 0),
+                    "rcon_packets_received": stats.get("packets_out", 0),
+                    "rcon_fragments": stats.get("fragments", 0),
+                    "bytes_sent": stats.get("bytes_in", 0),
+                    "bytes_received": stats.get("bytes_out", 0),
+                    "rcon_connections": stats.get("connections", 0),
+                    "dropped_packets": stats.get("dropped_packets", 0)
+                })
+                results.append(result)
+                print(format_result(result))
+        finally:
+            simulator.stop()
+        return results
+
+def format_result(result):
+    return (
+        f"{result['action']:<8} players={result['players']:<5} objectives={result['objectives']:<2} "
+        f"wall={result['wall_seconds']:>8.2f}s rcon={result['rcon_commands']:<6} "
+        f"sent={result['bytes_sent']:<8} recv={result['bytes_received']:<8} "
+        f"sqlite_rows={result.get('sqlite_rows_changed', '-'):<6} rss={result['peak_rss_kb']}KB"
+        + ("" if result["exit_code"] == 0 else f" EXIT {result['exit_code']}")
+    )
+
+def parse_counts(text):
+    return [int(value) for value in text.split(",") if value.strip()]
+
+# ---------------------------------------------------------------------------
+# Child side: count SQLite row changes, then run the framework as __main__
+# ---------------------------------------------------------------------------
+
+def run_child(counts_path, framework_args):
+    counts = {"sqlite_rows_changed": 0, "sqlite_commits": 0, "sqlite_connections": 0}
+    counts_lock = threading.Lock()
+    connections = weakref.WeakSet()
+    original_connect = sqlite3.connect
+
+    class counting_connection(sqlite3.Connection):
+        """Adds the connection's total_changes to the counts when it is closed or collected"""
+
+        def close(self):
+            self.record()
+            super().close()
+
+        def __del__(self):
+            self.record()
+
+        def record(self):
+            if getattr(self, "recorded", False):
+                return
+            try:
+                changes = self.total_changes
+            except sqlite3.ProgrammingError:
+                return
+            self.recorded = True
+            with counts_lock:
+                counts["sqlite_rows_changed"] += changes
+
+    def trace(statement):
+        # Trigger bodies re-trace their statement, so only COMMITs are counted this way
+        if statement.lstrip().upper().startswith("COMMIT"):
+            with counts_lock:
+                counts["sqlite_commits"] += 1
+
+    def connect(*connect_args, **connect_kwargs):
+        connect_kwargs.setdefault("factory", counting_connection)
+        db_conn = original_connect(*connect_args, **connect_kwargs)
+        db_conn.set_trace_callback(trace)
+        connections.add(db_conn)
+        with counts_lock:
+            counts["sqlite_connections"] += 1
+        return db_conn
+
+    def write_counts():
+        for db_conn in list(connections):
+            db_conn.record()
+        with open(counts_path, "w") as f:
+            json.dump(counts, f)
+
+    sqlite3.connect = connect
+    atexit.register(write_counts)
+    sys.path.insert(0, SRC_DIR)
+    sys.argv = [FRAMEWORK_PATH] + framework_args
+    runpy.run_path(FRAMEWORK_PATH, run_name="__main__")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        run_child(sys.argv[2], sys.argv[3:])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Benchmark event actions against the RCON simulator")
+    parser.add_argument("--players", type=parse_counts, default=[10, 100, 1000, 5000])
+    parser.add_argument("--objectives", type=parse_counts, default=[1, 4])
+    parser.add_argument("--online", type=int, default=20)
+    parser.add_argument("--activity", type=int, default=1000000, help="max random stat score (large = few ties)")
+    parser.add_argument("--latency-ms", type=float, default=0.5)
+    parser.add_argument("--fragment-size", type=int, default=rcon_simulator.FRAGMENT_SIZE)
+    parser.add_argument("--sidebar-seconds", type=int, default=1)
+    parser.add_argument("--datapack", action="store_true", help="aggregate through a generated datapack")
+    parser.add_argument("--timeout", type=float, default=900, help="seconds before an action is killed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="rcon_benchmark.json")
+    args = parser.parse_args()
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": []
+    }
+    for players in args.players:
+        for objectives in args.objectives:
+            report["results"].extend(run_case(players, objectives, args))
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
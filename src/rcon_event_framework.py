@@ -1,20 +1,35 @@
 #!/usr/bin/env python3
+import atexit
 import json
 import time
 import sys
 import os
-from mcrcon import MCRcon # type: ignore
-from datetime import datetime, timezone
+import math
+from datetime import datetime, timezone, timedelta
 from dotenv import load_dotenv
 import re
 import sql_calendar
+import log_policy
+import rcon_pool
+import rcon_async
+import rcon_retry
+from rcon_rate_limiter import PRIORITY_ANNOUNCE, PRIORITY_NORMAL, PRIORITY_BULK
+import scoreboard_snapshot
+import player_cache
+import datapack_generator
+import timeline
 
 # LOAD CONFIG
 load_dotenv()
-rcon_host = os.getenv("RCON_HOST")
-rcon_port = int(os.getenv("RCON_PORT"))
-rcon_pass = os.getenv("RCON_PASS")
 events_path = os.getenv("EVENTS_JSON_PATH")
+# Longest an action waits for queued effects (bells, countdowns, fireworks) before exiting
+EFFECTS_MAX_WAIT = float(os.getenv("EFFECTS_MAX_WAIT_SECONDS", 300))
+# Winners whose reward countdowns play at the same time; larger ties are rewarded in waves
+REWARD_MAX_CONCURRENT = max(1, int(os.getenv("REWARD_MAX_CONCURRENT", 10)))
+
+BELL_INTERVAL = 0.25
+FIREWORK_INTERVAL = 0.3
+COUNTDOWN_INTERVAL = 1
 
 def load_json(event_file):
     with open(event_file, "r") as f:
@@ -32,42 +47,142 @@ def log_to_sql(message, level="INFO"):
     except Exception as e:
         print(f"SQL logging failed: {e} - Message: {message}")
 
-def mcrcon_wrapper(cmds):
+def mcrcon_wrapper(cmds, priority=PRIORITY_NORMAL):
     """Execute RCON commands with error handling and logging"""
     if isinstance(cmds, str):
         cmds = [cmds]
 
     cmd_results = []
+    t_start = time.perf_counter()
 
     try:
-        with MCRcon(rcon_host, rcon_pass, port=rcon_port) as mcr:
+        pool = rcon_pool.get_pool()
+        with pool.connection() as conn:
             for cmd in cmds:
-                result = mcr.command(cmd)
+                result = pool.command(conn, cmd, priority)
                 cmd_results.append(result)
-                log_to_sql(f"RCON command executed: {cmd}")
+        log_rcon_commands(cmds, time.perf_counter() - t_start)
         return cmd_results
     except Exception as e:
-        error_msg = f"MCRCON error: {e}"
-        log_to_sql(error_msg, "ERROR")
-        for cmd in cmds:
-            log_to_sql(f"Failed RCON command: {cmd}", "ERROR")
+        log_rcon_failure(e, cmds)
+        return []
+
+def mcrcon_batch(cmds, priority=PRIORITY_BULK):
+    """Execute a batch of independent RCON commands pipelined on one socket"""
+    if isinstance(cmds, str):
+        cmds = [cmds]
+
+    t_start = time.perf_counter()
+    try:
+        cmd_results = rcon_async.execute_many(cmds, priority)
+        log_rcon_commands(cmds, time.perf_counter() - t_start)
+        return cmd_results
+    except Exception as e:
+        log_rcon_failure(e, cmds)
         return []
 
+def log_rcon_commands(cmds, seconds):
+    """Each command is a TRACE row; the INFO log gets one summary per LOG_SUMMARY_INTERVAL"""
+    if sql_calendar.log_enabled("TRACE"):
+        for cmd in cmds:
+            log_to_sql(f"RCON command executed: {cmd}", "TRACE")
+    _rcon_summary.add(len(cmds), seconds)
+
+def log_rcon_failure(error, cmds):
+    """One summarized row per failed call, however many commands it carried"""
+    if isinstance(error, rcon_retry.RconCircuitOpen):
+        # Rejected calls are counted by the breaker and reported when it closes
+        return
+    preview = "; ".join(cmds[:3])
+    if len(cmds) > 3:
+        preview += f" (+{len(cmds) - 3} more)"
+    log_to_sql(f"MCRCON error: {error} - {len(cmds)} command(s) not executed: {preview}", "ERROR")
+
+def log_breaker_change(old_state, new_state, breaker):
+    if new_state == rcon_retry.OPEN:
+        log_to_sql(
+            f"RCON circuit opened after {breaker.failures} consecutive failure(s): {breaker.last_error}; "
+            f"failing fast for {breaker.cooldown:.0f}s",
+            "ERROR"
+        )
+    elif new_state == rcon_retry.CLOSED:
+        log_to_sql(f"RCON circuit closed; {breaker.rejected} call(s) were rejected while it was open", "WARN")
+
+def log_breaker_summary():
+    """At exit, report a breaker that never closed again; its rejected calls are otherwise never logged"""
+    breaker = rcon_retry.get_breaker()
+    if breaker.state != rcon_retry.CLOSED or breaker.rejected:
+        log_to_sql(
+            f"RCON circuit still {breaker.state} at exit; {breaker.rejected} call(s) were rejected, "
+            f"last error: {breaker.last_error}",
+            "ERROR"
+        )
+
+rcon_retry.get_breaker().add_listener(log_breaker_change)
+atexit.register(log_breaker_summary)
+
+_rcon_summary = log_policy.log_summary(log_to_sql, "Executed {count:,} RCON command(s) in {seconds:.1f}s")
+atexit.register(_rcon_summary.flush)
+
+_effects = None
+
+def get_effects():
+    """Shared effects timeline for this process; cues run through mcrcon_wrapper"""
+    global _effects
+    if _effects is None:
+        _effects = timeline.timeline(
+            lambda cmds: mcrcon_wrapper(cmds, PRIORITY_ANNOUNCE),
+            on_error=lambda e, cmds: log_to_sql(f"Effect cue {cmds} failed: {e}", "ERROR")
+        )
+    return _effects
+
+def log_cue(note):
+    if note:
+        log_to_sql(note)
+
+def wait_for_effects():
+    """Let queued effects finish before the process exits
+
+    Waits until the last cue is due plus EFFECTS_MAX_WAIT of slack; cues still
+    queued after that are played right away rather than lost with the timer thread.
+    """
+    if _effects is None:
+        return
+    pending = _effects.pending()
+    if pending:
+        log_to_sql(f"Waiting for {pending} queued effect cues to play")
+    timeout = (_effects.last_due() or 0) + EFFECTS_MAX_WAIT
+    if not _effects.wait(timeout):
+        log_to_sql(f"Effect cues still pending after {timeout:.0f}s; playing the remaining {_effects.pending()} now", "WARN")
+        _effects.drain()
+
 def get_players():
     """Get list of tracked players from scoreboard and filter for real usernames"""
+    cached = player_cache.get(player_cache.TRACKED)
+    if cached is not None:
+        return cached
+
     player_list_cmd = "scoreboard players list"
-    results = mcrcon_wrapper(player_list_cmd)
-    
-    if not results:
-        log_to_sql("No results from player list command", "WARN")
+    parser = scoreboard_snapshot.tracked_list_parser()
+    t_start = time.perf_counter()
+    try:
+        # Large lists arrive in several 4 KB packets; parse them as they stream in
+        for chunk in rcon_pool.get_pool().stream(player_list_cmd):
+            parser.feed(chunk)
+        players = parser.close()
+        log_rcon_commands([player_list_cmd], time.perf_counter() - t_start)
+    except Exception as e:
+        log_rcon_failure(e, [player_list_cmd])
         return []
-    
-    log_to_sql(f"Player list query result: {results}")
 
-    match = re.search(r"There are \d+ tracked entity/entities: (.+)", results[0])
-    if match:
-        players = match.group(1).split(", ")
-        
+    if parser.parsed:
+        log_to_sql(f"Player list reply: {parser.declared} tracked entities in {parser.chunks} fragment(s)")
+        if not parser.complete:
+            log_to_sql(
+                f"Tracked entity count mismatch: server reported {parser.declared}, parsed {len(players)}",
+                "WARN"
+            )
+
         # New Filtering Logic:
         # 1. Filter out player names starting with '#' (fake players/storage entities)
         # 2. Filter out player names longer than 16 characters (invalid/fake players)
@@ -85,11 +200,29 @@ def get_players():
             log_to_sql(f"Filtered out fake players: {fake_players}", "INFO")
 
         log_to_sql(f"Found and filtered real players: {real_players}")
-        return real_players
+        return player_cache.put(player_cache.TRACKED, tuple(real_players))
     else:
         log_to_sql("Could not parse tracked players from scoreboard", "WARN")
         return []
 
+def get_online_players(fresh=False):
+    """Get the set of players currently online; fresh skips the cached list"""
+    cached = None if fresh else player_cache.get(player_cache.ONLINE)
+    if cached is not None:
+        return cached
+
+    online_result = mcrcon_wrapper("list")
+    if not online_result:
+        return frozenset()
+
+    online_match = re.search(r"online:\s*(.+)$", online_result[0])
+    if not online_match:
+        log_to_sql("Could not parse online players list", "WARN")
+        return player_cache.put(player_cache.ONLINE, frozenset())
+
+    online_players = frozenset(p.strip() for p in online_match.group(1).split(",") if p.strip())
+    return player_cache.put(player_cache.ONLINE, online_players)
+
 def start_event(event_data):
     """Start an event with announcements and setup commands using RCON batching"""
     log_to_sql(f"Starting event: {event_data.get('name', 'Unknown')}")
@@ -110,41 +243,66 @@ def start_event(event_data):
     batched_commands.append('execute as @a at @s run playsound minecraft:entity.wither.death master @s ~ ~ ~ 100')
     
     # Execute initial announcements
-    mcrcon_wrapper(batched_commands)
+    mcrcon_wrapper(batched_commands, PRIORITY_ANNOUNCE)
     log_to_sql(f"Initial event announcements and sounds sent.")
     
-    # 4. Play event start bells (must be done individually with delay)
+    # 4. Play event start bells on the effects timeline while setup continues
     bells_command = 'execute as @a at @s run playsound minecraft:block.bell.use master @s ~ ~ ~ 100'
-    for i in range(9):
-        mcrcon_wrapper(bells_command) # Executes bells_command as a single-item list
-        log_to_sql(f"Bell sound {i+1}/9 played")
-        time.sleep(0.25)
-        
+    get_effects().sequence(
+        [(i * BELL_INTERVAL, bells_command, f"Bell sound {i+1}/9 played") for i in range(9)],
+        callback=log_cue
+    )
+
+
     # 5. Execute setup commands
     try:
         setup_commands = event_data["commands"]["setup"]
         log_to_sql(f"Executing {len(setup_commands)} setup commands in batch.")
-        mcrcon_wrapper(setup_commands)
+        mcrcon_batch(setup_commands)
+        player_cache.invalidate(player_cache.TRACKED)
     except KeyError:
         log_to_sql("No setup commands found in event JSON", "WARN")
     except Exception as e:
         log_to_sql(f"Error executing setup commands: {e}", "ERROR")
 
+    # 6. Pre-install the aggregation function so the first display doesn't pay for a reload
+    if datapack_generator.is_enabled() and event_data.get("is_aggregate", False):
+        install_datapack(event_data)
+
     log_to_sql("Event setup completed successfully")
     print("✅ Event Setup Completed")
     
-def aggregate_scores(event_data):
-    """Aggregate player scores for events that require it"""
-    # get_players now returns only real, filtered players
-    player_list = get_players() 
-    
-    if not player_list:
-        log_to_sql("No real tracked players found for score aggregation", "WARN")
-        print("No tracked players. Nothing to aggregate.")
-        return
+def install_datapack(event_data):
+    """Write the event's aggregation function and reload the server if it changed"""
+    try:
+        if datapack_generator.install_aggregate_function(event_data):
+            log_to_sql(f"Aggregation datapack updated in {datapack_generator.pack_root()}, reloading datapacks")
+            mcrcon_wrapper(datapack_generator.reload_commands())
+        return True
+    except (OSError, KeyError) as e:
+        log_to_sql(f"Could not write aggregation datapack: {e}", "ERROR")
+        return False
 
-    log_to_sql(f"Aggregating scores for players: {player_list}")
+def aggregate_with_datapack(event_data):
+    """Recalculate online players' totals with one generated function call"""
+    if not install_datapack(event_data):
+        return False
+
+    function_cmd = f"function {datapack_generator.function_id(event_data)}"
+    result = mcrcon_wrapper(function_cmd)
+    if not result or "Unknown function" in result[0]:
+        log_to_sql(f"Datapack aggregation failed ({result}), falling back to RCON aggregation", "WARN")
+        return False
+
+    log_to_sql(f"Datapack aggregation executed: {result[0]}")
+    return True
 
+def aggregate_scores(event_data, exact=False):
+    """Aggregate player scores for events that require it
+
+    Uses the generated datapack function when DATAPACK_PATH is configured, unless
+    exact is set, in which case every tracked player (online or not) is recalculated over RCON.
+    """
     try:
         agg_obj = event_data["aggregate_objective"]
         objectives = event_data["commands"]["aggregate"]
@@ -157,6 +315,22 @@ def aggregate_scores(event_data):
         log_to_sql("Event does not require score aggregation")
         return
 
+    if not exact and datapack_generator.is_enabled() and aggregate_with_datapack(event_data):
+        scoreboard_snapshot.invalidate(agg_obj)
+        log_to_sql("Score aggregation completed")
+        print("✅ Calculated Aggregate Scores")
+        return
+
+    # get_players now returns only real, filtered players
+    player_list = get_players() 
+    
+    if not player_list:
+        log_to_sql("No real tracked players found for score aggregation", "WARN")
+        print("No tracked players. Nothing to aggregate.")
+        return
+
+    log_to_sql(f"Aggregating scores for players: {player_list}")
+
     # Batching for speedup 🚀
     rcon_commands = []
 
@@ -170,50 +344,51 @@ def aggregate_scores(event_data):
             rcon_commands.append(f"scoreboard players operation {player} {agg_obj} += {player} {objective}")
 
     log_to_sql(f"Executing {len(rcon_commands)} batched RCON commands for score aggregation")
-    mcrcon_wrapper(rcon_commands)
+    mcrcon_batch(rcon_commands)
+    scoreboard_snapshot.invalidate(agg_obj)
 
     log_to_sql("Score aggregation completed")
     print("✅ Calculated Aggregate Scores")
 
-def find_leaders(event_data, silent=False):
-    """Find the leading players and optionally announce them"""
+def snapshot_scores(objective, refresh=False):
+    """Read every tracked player's score for an objective in one pipelined batch"""
+    cached = scoreboard_snapshot.get_cached(objective)
+    if cached is not None and not refresh:
+        return cached
+
     player_list = get_players()
-    
     if not player_list:
-        log_to_sql("No players to check for leaders", "WARN")
-        return [], 0
+        return scoreboard_snapshot.score_table(objective, {})
+
+    t_start = time.time()
+    try:
+        replies = rcon_async.execute_many(scoreboard_snapshot.score_commands(objective, player_list))
+    except Exception as e:
+        log_to_sql(f"Scoreboard snapshot of {objective} failed for {len(player_list)} players: {e}", "ERROR")
+        return scoreboard_snapshot.score_table(objective, {})
+
+    table = scoreboard_snapshot.score_table.from_replies(objective, player_list, replies)
+    log_to_sql(f"Snapshot of {objective}: {len(table)} scores from {len(player_list)} players in {time.time() - t_start:.2f}s")
+    if table.missing:
+        log_to_sql(f"{len(table.missing)} players have no {objective} score set")
+    return scoreboard_snapshot.store(table)
 
+def find_leaders(event_data, silent=False):
+    """Find the leading players and optionally announce them"""
     try:
         main_obj = event_data["aggregate_objective"]
     except KeyError:
         log_to_sql("Missing aggregate_objective in event data", "ERROR")
         return [], 0
 
-    leaders = []
-    leading_score = 0
-
     log_to_sql(f"Checking scores for objective: {main_obj}")
 
-    for player in player_list:
-        score_cmd = f"scoreboard players get {player} {main_obj}"
-        score_result = mcrcon_wrapper(score_cmd)
-        log_to_sql(f"Score check for {player}: {score_result}")
-
-        if not score_result:
-            continue
+    table = snapshot_scores(main_obj)
+    if not len(table):
+        log_to_sql("No players to check for leaders", "WARN")
+        return [], 0
 
-        # Parse score from result
-        match = re.search(r"has (\d+)", score_result[0])
-        if match:
-            score = int(match.group(1))
-            
-            if not leaders or score > leading_score:
-                leaders = [player]
-                leading_score = score
-            elif score == leading_score:
-                leaders.append(player)
-        else:
-            log_to_sql(f"Could not parse score for {player} from: {score_result[0]}", "WARN")
+    leaders, leading_score = table.leaders()
 
     # FIXED: Check if top score is 0 (nobody participated)
     if leading_score == 0:
@@ -222,7 +397,7 @@ def find_leaders(event_data, silent=False):
             message = f"No one participated in the {event_data['name']} event."
             announcement = {"text": message, "color": "red"}
             announce_cmd = f"tellraw @a {json.dumps(announcement)}"
-            announce_result = mcrcon_wrapper(announce_cmd)
+            announce_result = mcrcon_wrapper(announce_cmd, PRIORITY_ANNOUNCE)
             log_to_sql(f"No participation announcement sent: {announce_result}")
         return [], 0
 
@@ -239,7 +414,7 @@ def find_leaders(event_data, silent=False):
 
             announcement = {"text": message, "color": "gold"}
             announce_cmd = f"tellraw @a {json.dumps(announcement)}"
-            announce_result = mcrcon_wrapper(announce_cmd)
+            announce_result = mcrcon_wrapper(announce_cmd, PRIORITY_ANNOUNCE)
             log_to_sql(f"Leader announcement sent: {announce_result}")
     else:
         log_to_sql("No leaders found")
@@ -247,8 +422,16 @@ def find_leaders(event_data, silent=False):
     print("✅ Leaders determined!")
     return leaders, leading_score
 
+SIDEBAR_CLEAR_CMD = "scoreboard objectives setdisplay sidebar"
+CLEAR_TASK_NAME = "server_clear_scoreboard"
+
 def display_scoreboard(event_data, unique_event_name=None):
-    """Display the event scoreboard for a specified duration using RCON batching"""
+    """Show the event scoreboard and defer clearing it until the configured duration has passed
+
+    For scheduled displays the clear becomes a child task in event_tasks so this
+    returns right away; otherwise it is queued on the effects timeline.
+    Returns the display duration in seconds, or None if the sidebar isn't configured.
+    """
     try:
         tracked_obj = event_data["aggregate_objective"]
         display_name = event_data["sidebar"]["displayName"]
@@ -257,7 +440,7 @@ def display_scoreboard(event_data, unique_event_name=None):
         color = event_data["sidebar"]["color"]
     except KeyError as e:
         log_to_sql(f"Missing scoreboard configuration: {e}", "ERROR")
-        return
+        return None
 
     log_to_sql(f"Displaying scoreboard for {duration} seconds")
     
@@ -278,20 +461,46 @@ def display_scoreboard(event_data, unique_event_name=None):
     mcrcon_wrapper(setup_commands)
     log_to_sql("Scoreboard display set and title modified.")
 
-    # Display for specified duration
-    time.sleep(duration)
+    # 3. Record when the board went up and defer the clear
+    if unique_event_name:
+        update_scoreboard_display_time(unique_event_name)
+
+    if not (unique_event_name and schedule_scoreboard_clear(unique_event_name, duration)):
+        get_effects().schedule(duration, SIDEBAR_CLEAR_CMD, note="Scoreboard cleared.", callback=log_cue)
+
+    log_to_sql("Scoreboard display started")
+    print("✅ Scoreboard was displayed")
+    return duration
+
+def schedule_scoreboard_clear(unique_event_name, duration):
+    """Queue a server_clear_scoreboard task for the event handler to run after duration seconds"""
+    try:
+        event_id = sql_calendar.get_event_id_by_unique_name(unique_event_name)
+        if not event_id:
+            log_to_sql(f"Could not find event ID for: {unique_event_name}", "ERROR")
+            return False
+
+        clear_at = datetime.now(timezone.utc) + timedelta(seconds=duration)
+        # Task times have whole-second precision; round up so the board is never cut short
+        clear_at = clear_at.replace(microsecond=0) + timedelta(seconds=math.ceil(clear_at.microsecond / 1e6))
+        if sql_calendar.insert_task(event_id, CLEAR_TASK_NAME, clear_at, 5) is None:
+            return False
+
+        log_to_sql(f"Scheduled scoreboard clear for event {event_id} at {clear_at.strftime('%Y-%m-%dT%H:%M:%SZ')}")
+        return True
+    except Exception as e:
+        log_to_sql(f"Error scheduling scoreboard clear: {e}", "ERROR")
+        return False
 
-    # 3. Clear scoreboard (must be done after sleep)
-    clear_cmd = "scoreboard objectives setdisplay sidebar"
-    mcrcon_wrapper(clear_cmd)
+def clear_scoreboard(event_data, unique_event_name=None):
+    """Clear the sidebar and record how long the scoreboard was actually on screen"""
+    mcrcon_wrapper(SIDEBAR_CLEAR_CMD)
     log_to_sql("Scoreboard cleared.")
 
-    # Update the scoreboard display time in database
     if unique_event_name:
-        update_scoreboard_display_time(unique_event_name)
+        record_scoreboard_screen_time(unique_event_name)
 
-    log_to_sql("Scoreboard display completed")
-    print("✅ Scoreboard was displayed")
+    print("✅ Scoreboard was cleared")
 
 def cleanup_objs(event_data):
     """Clean up scoreboard objectives after event using RCON batching"""
@@ -308,7 +517,9 @@ def cleanup_objs(event_data):
         cleanup_commands.append(f'scoreboard objectives remove {objective}')
 
     # Execute all cleanup commands at once
-    cleanup_result = mcrcon_wrapper(cleanup_commands)
+    cleanup_result = mcrcon_batch(cleanup_commands)
+    player_cache.invalidate(player_cache.TRACKED)
+    scoreboard_snapshot.invalidate()
     # The result contains all command outputs; internal logging in mcrcon_wrapper
     # covers the individual command execution.
 
@@ -331,6 +542,24 @@ def update_scoreboard_display_time(unique_event_name):
         log_to_sql(f"Error updating scoreboard time: {e}", "ERROR")
         return False
 
+def record_scoreboard_screen_time(unique_event_name):
+    """Store the seconds between the last display and now as the scoreboard's on-screen time"""
+    try:
+        event_id = sql_calendar.get_event_id_by_unique_name(unique_event_name)
+        event = sql_calendar.get_event_by_id(event_id) if event_id else None
+        if not event or not event[10]:
+            log_to_sql(f"No scoreboard display time recorded for: {unique_event_name}", "WARN")
+            return False
+
+        shown_at = datetime.fromisoformat(event[10].replace('Z', '+00:00'))
+        seconds = max(0, int((datetime.now(timezone.utc) - shown_at).total_seconds()))
+        sql_calendar.update_scoreboard_seconds(event_id, seconds)
+        log_to_sql(f"Scoreboard for event {event_id} ({unique_event_name}) was on screen for {seconds}s")
+        return True
+    except Exception as e:
+        log_to_sql(f"Error recording scoreboard screen time: {e}", "ERROR")
+        return False
+
 def save_winners_to_sql(event_data, leaders, final_score):
     """Save event winners directly to SQLite database"""
     try:
@@ -351,19 +580,14 @@ def save_winners_to_sql(event_data, leaders, final_score):
             return
 
         # Get online players to determine who was online
-        online_cmd = "list"
-        online_result = mcrcon_wrapper(online_cmd)
-        online_players = []
-        
-        if online_result:
-            online_match = re.search(r"online:\s*(.+)$", online_result[0])
-            if online_match:
-                online_players = [p.strip() for p in online_match.group(1).split(",")]
+        online_players = get_online_players()
 
-        # Save each winner
+        # Save each winner with the score from this action's snapshot
+        table = scoreboard_snapshot.get_cached(event_data.get("aggregate_objective"))
         for winner in leaders:
             was_online = winner in online_players
-            sql_calendar.insert_winner(event_id, winner, final_score, was_online)
+            score = table.get(winner, final_score) if table else final_score
+            sql_calendar.insert_winner(event_id, winner, score, was_online)
             log_to_sql(f"Saved winner: {winner} (online: {was_online})")
 
         log_to_sql(f"Saved {len(leaders)} winners for event {unique_name}")
@@ -372,72 +596,87 @@ def save_winners_to_sql(event_data, leaders, final_score):
     except Exception as e:
         log_to_sql(f"Error saving winners to database: {e}", "ERROR")
 
-def give_reward_item(winners, event_data):
-    """Give reward items to online winners using limited RCON batching"""
+def reward_cues(winner, event_data):
+    """One winner's countdown as (offset, cmds) cues: a line per second, then the reward"""
+    # Winner notification sequence, one line per second
+    notifications = [
+        f'tellraw {winner} "You have won the {event_data["name"]} event!"',
+        f'tellraw {winner} "You will be receiving your prize in..."',
+        f'tellraw {winner} "3!"',
+        f'tellraw {winner} "2!"',
+        f'tellraw {winner} "1!"'
+    ]
+
+    # Give reward item and send final notification (Batched)
+    reward_commands = []
+
+    # Give reward item
+    reward_cmd = f'give {winner} {event_data["reward_cmd"]}'
+    reward_commands.append(reward_cmd.replace("'", '"')) # Correct single/double quote handling
+
+    # Item received notification
+    item_msg = f"You have been given the legendary {event_data['reward_name']}!"
+    item_json = {"text": item_msg, "color": "light_purple"}
+    item_cmd = f'tellraw {winner} {json.dumps(item_json)}'
+    reward_commands.append(item_cmd)
+
+    cues = [(i * COUNTDOWN_INTERVAL, [notif]) for i, notif in enumerate(notifications)]
+    cues.append((len(notifications) * COUNTDOWN_INTERVAL, reward_commands))
+    return cues
+
+def give_reward_item(winners, event_data, start=0):
+    """Give reward items to online winners, starting the countdowns start seconds from now"""
     if not winners:
         log_to_sql("No winners to reward")
         return
 
-    # Get online players (SINGLE RCON CALL)
-    online_cmd = "list"
-    online_result = mcrcon_wrapper(online_cmd)
-    
-    # Parse online players (Parser remains the same)
-    online_players = []
-    if online_result:
-        online_match = re.search(r"online:\s*(.+)$", online_result[0])
-        if online_match:
-            online_players = [p.strip() for p in online_match.group(1).split(",")]
-        else:
-            log_to_sql("Could not parse online players list", "WARN")
+    # Who is online is decided when each wave starts, not now
+    get_effects().call(start, lambda: reward_wave(list(winners), event_data))
+
+    log_to_sql(f"Reward distribution scheduled for {len(winners)} winners")
+    print("✅ Scheduled rewards for online winners!")
+
+def reward_wave(winners, event_data):
+    """Start countdowns for up to REWARD_MAX_CONCURRENT winners online right now; runs on the effects timeline"""
+    online_players = get_online_players(fresh=True)
 
     online_winners = [player for player in winners if player in online_players]
     offline_winners = [player for player in winners if player not in online_players]
 
     log_to_sql(f"Online winners: {online_winners}, Offline winners: {offline_winners}")
 
-    for winner in online_winners:
+    wave = online_winners[:REWARD_MAX_CONCURRENT]
+    sequences = {}
+    for winner in wave:
         try:
-            # Winner notification sequence (Requires sequential execution with delay)
-            notifications = [
-                f'tellraw {winner} "You have won the {event_data["name"]} event!"',
-                f'tellraw {winner} "You will be receiving your prize in..."',
-                f'tellraw {winner} "3!"',
-                f'tellraw {winner} "2!"',
-                f'tellraw {winner} "1!"'
-            ]
-            
-            for notif in notifications:
-                mcrcon_wrapper(notif) # Executes as a single-item list
-                time.sleep(1)
-
-            # Give reward item and send final notification (Batched)
-            reward_commands = []
-            
-            # Give reward item
-            reward_cmd = f'give {winner} {event_data["reward_cmd"]}'
-            reward_commands.append(reward_cmd.replace("'", '"')) # Correct single/double quote handling
-
-            # Item received notification
-            item_msg = f"You have been given the legendary {event_data['reward_name']}!"
-            item_json = {"text": item_msg, "color": "light_purple"}
-            item_cmd = f'tellraw {winner} {json.dumps(item_json)}'
-            reward_commands.append(item_cmd)
-            
-            # Execute batched give/notification
-            mcrcon_wrapper(reward_commands)
-            log_to_sql(f"Gave reward and sent final notification to {winner}")
-
+            sequences[winner] = reward_cues(winner, event_data)
         except KeyError as e:
             log_to_sql(f"Missing reward configuration: {e}", "ERROR")
         except Exception as e:
             log_to_sql(f"Error rewarding {winner}: {e}", "ERROR")
 
-    if offline_winners:
-        log_to_sql(f"Offline winners need manual reward: {offline_winners}", "WARN")
+    # Countdowns in a wave play together: each second's lines for every winner go out as
+    # one batch on one connection, so a tie costs no extra ceremony time
+    wave_end = 0
+    if sequences:
+        merged = {}
+        for winner in sequences:
+            for offset, cmds in sequences[winner]:
+                merged.setdefault(offset, []).extend(cmds)
+
+        cues = sorted(merged.items())
+        last_offset, last_cmds = cues[-1]
+        cues[-1] = (last_offset, last_cmds, f"Gave reward and sent final notification to {', '.join(sequences)}")
+        wave_end = get_effects().sequence(cues, callback=log_cue) + COUNTDOWN_INTERVAL
+
+    if len(online_winners) <= len(wave):
+        if offline_winners:
+            log_to_sql(f"Offline winners need manual reward: {offline_winners}", "WARN")
+        return
 
-    log_to_sql("Reward distribution completed")
-    print("✅ Distributed rewards to online winners!")
+    # The rest go in the next wave; offline winners are checked again when it starts
+    next_wave = [player for player in winners if player not in wave]
+    get_effects().call(wave_end, lambda: reward_wave(next_wave, event_data))
 
 def closing_ceremony(event_data):
     """Execute closing ceremony with effects and winner announcements"""
@@ -450,16 +689,16 @@ def closing_ceremony(event_data):
     end_text = f"The {event_data['name']} event has ended!"
     end_json = {"text": end_text, "color": "gold"}
     end_cmd = f"tellraw @a {json.dumps(end_json)}"
-    mcrcon_wrapper(end_cmd)
+    mcrcon_wrapper(end_cmd, PRIORITY_ANNOUNCE)
 
     # Fireworks display
     firework_particles = 'execute as @a at @s run particle minecraft:firework ~ ~ ~ 1 1 1 0.2 100 force'
     firework_sounds = 'execute as @a at @s run playsound minecraft:entity.firework_rocket.twinkle master @s ~ ~ ~ 100'
 
     log_to_sql("Playing fireworks display")
-    for i in range(5):
-        mcrcon_wrapper([firework_particles, firework_sounds])
-        time.sleep(0.3)
+    effects = get_effects()
+    effects.sequence([(i * FIREWORK_INTERVAL, [firework_particles, firework_sounds]) for i in range(5)])
+    fireworks_end = 5 * FIREWORK_INTERVAL
 
     # FIXED: Handle different winner scenarios
     if not leaders or final_score == 0:
@@ -467,32 +706,28 @@ def closing_ceremony(event_data):
         no_winner_text = "Unfortunately, nobody participated in this event!"
         no_winner_json = {"text": no_winner_text, "color": "red"}
         no_winner_cmd = f"tellraw @a {json.dumps(no_winner_json)}"
-        mcrcon_wrapper(no_winner_cmd)
-        log_to_sql("No participation announcement sent")
+        effects.schedule(fireworks_end, no_winner_cmd, note="No participation announcement sent", callback=log_cue)
     else:
         # We have winners with actual scores
         winner_text = f"{', '.join(leaders)} won the event with {final_score} {event_data.get('score_text', 'points')}"
         winner_json = {"text": winner_text, "color": "green"}
         winner_cmd = f"tellraw @a {json.dumps(winner_json)}"
-        mcrcon_wrapper(winner_cmd)
-        log_to_sql(f"Winner announcement: {winner_text}")
+        effects.schedule(fireworks_end, winner_cmd, note=f"Winner announcement: {winner_text}", callback=log_cue)
 
-    # Ceremony music
+    # Ceremony music starts once the fireworks are over
     music_cmd = 'execute as @a at @s run playsound minecraft:music_disc.lava_chicken master @s ~ ~ ~ 100'
-    mcrcon_wrapper(music_cmd)
-    log_to_sql("Started ceremony music")
+    effects.schedule(fireworks_end, music_cmd, note="Started ceremony music", callback=log_cue)
+
+    # Display final scoreboard; music stops and rewards start once it is cleared
+    duration = display_scoreboard(event_data) or 0
+    display_end = max(duration, fireworks_end)
 
-    # Display final scoreboard
-    display_scoreboard(event_data)
-    
-    # Stop music
     stop_cmd = 'stopsound @a'
-    mcrcon_wrapper(stop_cmd)
-    log_to_sql("Stopped ceremony music")
+    effects.schedule(display_end, stop_cmd, note="Stopped ceremony music", callback=log_cue)
 
     # FIXED: Only distribute rewards if there are actual winners
     if leaders and final_score > 0:
-        give_reward_item(leaders, event_data)
+        give_reward_item(leaders, event_data, start=display_end)
 
     # Save results to database
     save_winners_to_sql(event_data, leaders, final_score)
@@ -524,6 +759,10 @@ def run_event(action, json_file, unique_name=None):
     if unique_name:
         event_id = sql_calendar.get_event_id_by_unique_name(unique_name)
 
+    # Player lists and score snapshots are only valid within one action
+    player_cache.invalidate()
+    scoreboard_snapshot.invalidate()
+
     # Execute requested action
     try:
         if action == "start":
@@ -532,16 +771,24 @@ def run_event(action, json_file, unique_name=None):
             aggregate_scores(event_data)
             find_leaders(event_data)
             display_scoreboard(event_data, unique_event_name=unique_name)
+        elif action == "clear":
+            clear_scoreboard(event_data, unique_event_name=unique_name)
         elif action == "clean":
-            aggregate_scores(event_data)
+            # The ceremony shows its own scoreboard, so drop any pending display clear
+            if event_id:
+                sql_calendar.delete_pending_tasks(event_id, CLEAR_TASK_NAME)
+            aggregate_scores(event_data, exact=True)
             closing_ceremony(event_data)
+            # Objectives must outlive the ceremony's scoreboard display
+            wait_for_effects()
             cleanup_objs(event_data)
         else:
             error_msg = f"Unknown action: {action}"
             log_to_sql(error_msg, "ERROR")
             print(f"❌ {error_msg}")
             sys.exit(1)
-            
+
+        wait_for_effects()
         log_to_sql(f"Event action '{action}' completed successfully")
         
     except Exception as e:
@@ -552,7 +799,7 @@ def run_event(action, json_file, unique_name=None):
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print("Usage: python rcon_event_framework.py <start|display|clean> <json-file> [unique_event_name]")
+        print("Usage: python rcon_event_framework.py <start|display|clear|clean> <json-file> [unique_event_name]")
         sys.exit(1)
 
     action = sys.argv[1]
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Process-wide RCON connection pool
+Keeps authenticated connections open between calls, health-checks idle ones
+and transparently reconnects when the server has dropped a socket.
+"""
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from rcon_protocol import rcon_connection, RconError, RconNotSent
+import rcon_rate_limiter
+import rcon_retry
+
+load_dotenv()
+RCON_HOST = os.getenv("RCON_HOST")
+RCON_PORT = int(os.getenv("RCON_PORT", 25575))
+RCON_PASS = os.getenv("RCON_PASS")
+
+POOL_SIZE = int(os.getenv("RCON_POOL_SIZE", 2))
+RCON_TIMEOUT = float(os.getenv("RCON_TIMEOUT", 5))
+# Seconds to wait for a command's reply (connecting and login use RCON_TIMEOUT)
+RCON_COMMAND_TIMEOUT = float(os.getenv("RCON_COMMAND_TIMEOUT", RCON_TIMEOUT))
+# Idle connections older than this are pinged before being handed out
+HEALTH_CHECK_INTERVAL = float(os.getenv("RCON_HEALTH_CHECK_INTERVAL", 30))
+# Idle connections older than this are closed instead of reused
+MAX_IDLE_SECONDS = float(os.getenv("RCON_MAX_IDLE_SECONDS", 300))
+
+class rcon_pool():
+
+    def __init__(self, host, port, password, size=POOL_SIZE, timeout=RCON_TIMEOUT,
+                 command_timeout=RCON_COMMAND_TIMEOUT, breaker=None):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.command_timeout = command_timeout
+        self.breaker = breaker if breaker is not None else rcon_retry.get_breaker()
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.stats = {
+            "connects": 0,
+            "reconnects": 0,
+            "health_checks": 0,
+            "commands": 0,
+            "fragmented_replies": 0
+        }
+
+    def _open(self):
+        """Open and authenticate a new connection, retrying with backoff while the server is unreachable"""
+        conn = rcon_connection(
+            self.host, self.port, self.password, timeout=self.timeout, command_timeout=self.command_timeout
+        )
+        try:
+            rcon_retry.connect_with_retry(conn.connect, self.breaker)
+        except RconError as e:
+            self.breaker.record_failure(e)
+            raise
+        self.breaker.record_success()
+        with self._lock:
+            self.stats["connects"] += 1
+        return conn
+
+    def _is_healthy(self, conn):
+        with self._lock:
+            self.stats["health_checks"] += 1
+        try:
+            return conn.ping()
+        except RconError:
+            return False
+
+    def _checkout(self):
+        self._slots.acquire()
+        try:
+            # Fail fast while the breaker is open instead of waiting on a dead server
+            self.breaker.allow()
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+
+            if conn is not None and (not conn.connected or conn.closed_by_peer()):
+                # Caught here, before a command is written to it; a command is never resent once written
+                conn.close()
+                conn = None
+
+            if conn is not None:
+                idle_for = time.monotonic() - conn.last_used
+                if idle_for > MAX_IDLE_SECONDS:
+                    conn.close()
+                    conn = None
+                elif idle_for > HEALTH_CHECK_INTERVAL and not self._is_healthy(conn):
+                    conn.close()
+                    conn = None
+                    with self._lock:
+                        self.stats["reconnects"] += 1
+
+            return conn if conn is not None else self._open()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkin(self, conn):
+        try:
+            if conn.connected:
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for a sequence of commands"""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def command(self, conn, cmd, priority=rcon_rate_limiter.PRIORITY_NORMAL):
+        """Run a command, reconnecting once if the pooled socket was found dead while sending it.
+        A connection lost after the command was written is raised: the server may already have run it."""
+        limiter = self._throttle(priority)
+        started = time.monotonic()
+        try:
+            try:
+                result = conn.command(cmd)
+            except RconNotSent:
+                self._reconnect(conn)
+                started = time.monotonic()
+                result = conn.command(cmd)
+        except RconError as e:
+            self.breaker.record_failure(e)
+            raise
+        self._finish_command(conn, limiter, time.monotonic() - started)
+        return result
+
+    def stream(self, cmd, priority=rcon_rate_limiter.PRIORITY_NORMAL):
+        """Yield a command's reply chunk by chunk as its packets arrive, holding a pooled connection until the end"""
+        limiter = self._throttle(priority)
+        with self.connection() as conn:
+            started = time.monotonic()
+            latency = None
+            try:
+                try:
+                    for chunk in conn.command_fragments(cmd):
+                        latency = latency if latency is not None else time.monotonic() - started
+                        yield chunk
+                except RconNotSent:
+                    # A dead keep-alive socket failed the send itself, so the server never saw the command
+                    self._reconnect(conn)
+                    started = time.monotonic()
+                    for chunk in conn.command_fragments(cmd):
+                        latency = latency if latency is not None else time.monotonic() - started
+                        yield chunk
+            except RconError as e:
+                self.breaker.record_failure(e)
+                raise
+            self._finish_command(conn, limiter, latency or 0.0)
+
+    def _throttle(self, priority):
+        limiter = rcon_rate_limiter.get_limiter()
+        if limiter is not None:
+            limiter.acquire(priority)
+        return limiter
+
+    def _reconnect(self, conn):
+        with self._lock:
+            self.stats["reconnects"] += 1
+        conn.connect()
+        with self._lock:
+            self.stats["connects"] += 1
+
+    def _finish_command(self, conn, limiter, latency):
+        self.breaker.record_success()
+        with self._lock:
+            self.stats["commands"] += 1
+            if conn.last_fragments > 1:
+                self.stats["fragmented_replies"] += 1
+
+        if limiter is not None:
+            limiter.observe_latency(latency)
+            if limiter.tick_query_due():
+                self._query_tick(conn, limiter)
+
+    def _query_tick(self, conn, limiter):
+        """Best-effort tick-time probe; a dead socket is picked up by the next command"""
+        try:
+            limiter.observe_tick_reply(conn.command("tick query"))
+        except RconError:
+            pass
+
+    def execute(self, cmds, priority=rcon_rate_limiter.PRIORITY_NORMAL):
+        """Execute a list of commands on one pooled connection"""
+        if isinstance(cmds, str):
+            cmds = [cmds]
+
+        with self.connection() as conn:
+            return [self.command(conn, cmd, priority) for cmd in cmds]
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the process-wide pool, creating it from .env settings on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = rcon_pool(RCON_HOST, RCON_PORT, RCON_PASS)
+            atexit.register(_pool.close_all)
+        return _pool
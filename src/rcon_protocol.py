@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Source RCON protocol helpers
+Packet encoding/decoding and a small blocking client used by the RCON pool.
+
+Replies longer than FRAGMENT_SIZE bytes are split by the server into several
+packets with the same request ID. A full-size fragment is followed up with an
+empty SERVERDATA_RESPONSE_VALUE "sentinel" packet: the server answers it only
+after the last fragment, which marks the end of the reply.
+"""
+import codecs
+import itertools
+import select
+import socket
+import struct
+import time
+
+SERVERDATA_RESPONSE_VALUE = 0
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_AUTH = 3
+
+# Packet body is id (4) + type (4) + payload + two NUL bytes
+PACKET_HEADER_SIZE = 8
+PACKET_PADDING = b"\x00\x00"
+MAX_PACKET_SIZE = 4096 + PACKET_HEADER_SIZE + len(PACKET_PADDING) + 1024
+# Largest reply payload the server puts in one packet
+FRAGMENT_SIZE = 4096
+
+class RconError(Exception):
+    """Raised for RCON protocol, authentication or connection failures"""
+
+class RconConnectionLost(RconError):
+    """Raised when the server closed the socket before a command was answered"""
+
+class RconNotSent(RconConnectionLost):
+    """Raised when the socket failed while a command was being sent; the server never ran it, so resending is safe"""
+
+class RconUnavailable(RconError):
+    """Raised when no connection could be opened; nothing was sent, so retrying is safe"""
+
+class RconAuthError(RconError):
+    """Raised when the server rejects the RCON password"""
+
+def encode_packet(request_id, packet_type, payload):
+    """Build a length-prefixed RCON packet"""
+    body = struct.pack("<ii", request_id, packet_type) + payload.encode("utf8") + PACKET_PADDING
+    return struct.pack("<i", len(body)) + body
+
+def split_packet(body):
+    """Split a packet body (without its length prefix) into (request_id, type, raw payload bytes)"""
+    if len(body) < PACKET_HEADER_SIZE + len(PACKET_PADDING) or body[-2:] != PACKET_PADDING:
+        raise RconError("Malformed RCON packet")
+    request_id, packet_type = struct.unpack("<ii", body[:PACKET_HEADER_SIZE])
+    return request_id, packet_type, body[PACKET_HEADER_SIZE:-2]
+
+def decode_packet(body):
+    """Split a packet body (without its length prefix) into (request_id, type, payload)"""
+    request_id, packet_type, payload = split_packet(body)
+    return request_id, packet_type, payload.decode("utf8", errors="replace")
+
+def utf8_decoder():
+    """Incremental decoder so multi-byte characters split across fragments survive"""
+    return codecs.getincrementaldecoder("utf8")(errors="replace")
+
+class rcon_connection():
+    """A single authenticated RCON socket that can be kept open and reused"""
+
+    def __init__(self, host, port, password, timeout=5, command_timeout=None):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.command_timeout = command_timeout or timeout
+        self.sock = None
+        self.created_at = None
+        self.last_used = None
+        self.last_fragments = 0
+        self._ids = itertools.count(1)
+
+    @property
+    def connected(self):
+        return self.sock is not None
+
+    def connect(self):
+        """Open the socket and authenticate"""
+        self.close()
+        try:
+            self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self.sock.settimeout(self.timeout)
+        except OSError as e:
+            self.sock = None
+            raise RconUnavailable(f"Could not connect to {self.host}:{self.port}: {e}")
+
+        auth_id = next(self._ids)
+        self._send(auth_id, SERVERDATA_AUTH, self.password or "")
+        while True:
+            request_id, packet_type, _ = self._read_packet()
+            if request_id == -1:
+                self.close()
+                raise RconAuthError("RCON login failed")
+            if request_id == auth_id and packet_type == SERVERDATA_AUTH_RESPONSE:
+                break
+
+        self.sock.settimeout(self.command_timeout)
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        return self
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+
+    def command(self, cmd):
+        """Run one command and return the server's full (reassembled) reply text"""
+        return "".join(self.command_fragments(cmd))
+
+    def command_fragments(self, cmd):
+        """Run one command and yield its reply one packet at a time as decoded text"""
+        request_id = next(self._ids)
+        try:
+            self._send(request_id, SERVERDATA_EXECCOMMAND, cmd)
+        except RconConnectionLost as e:
+            raise RconNotSent(str(e))
+        decoder = utf8_decoder()
+        sentinel_id = None
+        fragments = 0
+        finished = False
+        try:
+            while True:
+                reply_id, _, payload = self._read_raw_packet()
+                if reply_id == request_id:
+                    fragments += 1
+                    yield decoder.decode(payload)
+                    if sentinel_id is None:
+                        if len(payload) < FRAGMENT_SIZE:
+                            break
+                        # Sent only after the first fragment so it never shares a read with the command
+                        sentinel_id = next(self._ids)
+                        self._send(sentinel_id, SERVERDATA_RESPONSE_VALUE, "")
+                elif reply_id == sentinel_id:
+                    break
+
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+            finished = True
+        finally:
+            self.last_fragments = fragments
+            if finished:
+                self.last_used = time.monotonic()
+            else:
+                # Abandoned mid-reply: unread fragments would be mistaken for the next reply
+                self.close()
+
+    def closed_by_peer(self):
+        """True if the server has already closed this idle socket; checked without sending anything"""
+        if self.sock is None:
+            return True
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            # An idle socket only becomes readable at EOF (or with a reset pending)
+            return bool(readable) and self.sock.recv(1, socket.MSG_PEEK) == b""
+        except OSError:
+            return True
+
+    def ping(self):
+        """Cheap liveness probe: servers answer unknown packet types without running anything"""
+        request_id = next(self._ids)
+        self._send(request_id, SERVERDATA_RESPONSE_VALUE, "")
+        while True:
+            reply_id, _, _ = self._read_packet()
+            if reply_id == request_id:
+                self.last_used = time.monotonic()
+                return True
+
+    def _send(self, request_id, packet_type, payload):
+        if self.sock is None:
+            raise RconError("Must connect before sending data")
+        try:
+            self.sock.sendall(encode_packet(request_id, packet_type, payload))
+        except (BrokenPipeError, ConnectionResetError) as e:
+            self.close()
+            raise RconConnectionLost(f"RCON connection lost while sending: {e}")
+        except OSError as e:
+            self.close()
+            raise RconError(f"RCON send failed: {e}")
+
+    def _recv_exact(self, length):
+        data = bytearray()
+        while len(data) < length:
+            try:
+                chunk = self.sock.recv(length - len(data))
+            except socket.timeout:
+                timeout = self.sock.gettimeout()
+                self.close()
+                raise RconError(f"RCON reply timed out after {timeout}s")
+            except ConnectionResetError as e:
+                self.close()
+                raise RconConnectionLost(f"RCON connection reset: {e}")
+            except OSError as e:
+                self.close()
+                raise RconError(f"RCON receive failed: {e}")
+            if not chunk:
+                self.close()
+                raise RconConnectionLost("RCON connection closed by server")
+            data.extend(chunk)
+        return bytes(data)
+
+    def _read_raw_packet(self):
+        (length,) = struct.unpack("<i", self._recv_exact(4))
+        if length < PACKET_HEADER_SIZE + len(PACKET_PADDING) or length > MAX_PACKET_SIZE:
+            self.close()
+            raise RconError(f"Invalid RCON packet length: {length}")
+        return split_packet(self._recv_exact(length))
+
+    def _read_packet(self):
+        request_id, packet_type, payload = self._read_raw_packet()
+        return request_id, packet_type, payload.decode("utf8", errors="replace")
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Adaptive RCON rate limiter
+Token bucket with priority lanes (announcements before bulk scoreboard math).
+The refill rate backs off when RCON replies slow down relative to the fastest
+round trip seen (so a distant server isn't mistaken for a congested one) or the
+server reports a high tick time, and creeps back up while the server keeps up.
+State is published to a file for the admin GUI and resumed by the next event
+action's process, so what one action learned carries over to the next.
+"""
+import atexit
+import calendar
+import json
+import os
+import re
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+RATE_LIMIT_ENABLED = os.getenv("RCON_RATE_LIMIT", "true").lower() == "true"
+RATE_START = float(os.getenv("RCON_RATE_START", 100))
+RATE_MIN = float(os.getenv("RCON_RATE_MIN", 10))
+RATE_MAX = float(os.getenv("RCON_RATE_MAX", 500))
+RATE_BURST = float(os.getenv("RCON_RATE_BURST", 50))
+# Reply delay tolerated on top of the baseline round trip before backing off
+LATENCY_MARGIN_MS = float(os.getenv("RCON_LATENCY_MARGIN_MS", 50))
+# Fixed latency target instead of baseline + margin; 0 derives it from measured replies
+TARGET_LATENCY_MS = float(os.getenv("RCON_TARGET_LATENCY_MS", 0))
+# How fast the baseline follows replies that are slower than it, e.g. after a route change
+BASELINE_DRIFT = 0.002
+# Seconds between `tick query` probes; 0 disables them (needs 1.20.3+)
+TICK_QUERY_INTERVAL = float(os.getenv("RCON_TICK_QUERY_INTERVAL", 0))
+TARGET_MSPT = float(os.getenv("RCON_TARGET_MSPT", 40))
+STATE_FILE = os.getenv("RCON_LIMITER_STATE_FILE", "./logs/rcon_limiter_state.json")
+STATE_WRITE_INTERVAL = 2
+# Each event action is its own process; a new limiter picks up where one that saved this recently left off
+STATE_MAX_AGE = float(os.getenv("RCON_LIMITER_STATE_MAX_AGE", 600))
+
+PRIORITY_ANNOUNCE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+LANE_NAMES = {PRIORITY_ANNOUNCE: "announce", PRIORITY_NORMAL: "normal", PRIORITY_BULK: "bulk"}
+
+TICK_PATTERN = re.compile(r"Average time per tick:\s*([\d.]+)\s*ms")
+
+class rate_limiter():
+
+    def __init__(self, rate=RATE_START, burst=RATE_BURST, min_rate=RATE_MIN, max_rate=RATE_MAX,
+                 target_latency_ms=TARGET_LATENCY_MS, latency_margin_ms=LATENCY_MARGIN_MS, target_mspt=TARGET_MSPT,
+                 tick_query_interval=TICK_QUERY_INTERVAL, state_file=STATE_FILE):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.burst = burst
+        self.tokens = burst
+        self.target_latency = target_latency_ms / 1000
+        self.latency_margin = latency_margin_ms / 1000
+        self.target_mspt = target_mspt
+        self.tick_query_interval = tick_query_interval
+        self.state_file = state_file
+        self.latency_ewma = None
+        self.latency_baseline = None
+        self.last_mspt = None
+        self._last_refill = time.monotonic()
+        self._last_tick_query = time.monotonic()
+        self._last_state_write = 0
+        self._waiting = {lane: 0 for lane in LANE_NAMES}
+        self._cond = threading.Condition()
+        self.stats = {"granted": 0, "throttled": 0, "backoffs": 0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _blocked_by_higher_lane(self, priority):
+        return any(count for lane, count in self._waiting.items() if lane < priority)
+
+    def try_acquire(self, priority=PRIORITY_NORMAL, tokens=1):
+        """Take tokens without waiting; returns False if the caller would have to wait"""
+        with self._cond:
+            self._refill()
+            if self.tokens >= tokens and not self._blocked_by_higher_lane(priority):
+                self.tokens -= tokens
+                self.stats["granted"] += 1
+                return True
+            return False
+
+    def acquire(self, priority=PRIORITY_NORMAL, tokens=1):
+        """Block until tokens are available; lower-numbered lanes are served first"""
+        with self._cond:
+            self._refill()
+            if self.tokens >= tokens and not self._blocked_by_higher_lane(priority):
+                self.tokens -= tokens
+                self.stats["granted"] += 1
+                return 0.0
+
+            started = time.monotonic()
+            self.stats["throttled"] += 1
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    self._refill()
+                    if self.tokens >= tokens and not self._blocked_by_higher_lane(priority):
+                        self.tokens -= tokens
+                        self.stats["granted"] += 1
+                        break
+                    self._cond.wait(max(0.001, (tokens - self.tokens) / self.rate))
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+            return time.monotonic() - started
+
+    def observe_latency(self, seconds):
+        """Feed one measured reply latency: additive increase, multiplicative decrease
+
+        Only the delay above the baseline (the fastest reply seen) counts as
+        congestion, so the network round trip itself never forces a back-off.
+        """
+        with self._cond:
+            if self.latency_ewma is None:
+                self.latency_ewma = seconds
+                self.latency_baseline = seconds
+            else:
+                self.latency_ewma = 0.8 * self.latency_ewma + 0.2 * seconds
+                self.latency_baseline = min(seconds, self.latency_baseline + (seconds - self.latency_baseline) * BASELINE_DRIFT)
+
+            baseline, margin = self._latency_target()
+            delay = self.latency_ewma - baseline
+            if delay > 2 * margin:
+                self._set_rate(self.rate * 0.7)
+                self.stats["backoffs"] += 1
+            elif delay < margin:
+                self._set_rate(self.rate + max(1.0, self.rate * 0.02))
+        self.save_state()
+
+    def _latency_target(self):
+        """(baseline, margin) in seconds; a fixed target is treated as margin over a zero baseline"""
+        if self.target_latency > 0:
+            return 0.0, self.target_latency
+        return self.latency_baseline or 0.0, self.latency_margin
+
+    def observe_tick(self, mspt):
+        """Feed one server tick time; back off hard when the server is falling behind"""
+        with self._cond:
+            self.last_mspt = mspt
+            if mspt > self.target_mspt:
+                self._set_rate(self.rate * 0.5)
+                self.stats["backoffs"] += 1
+        self.save_state(force=True)
+
+    def _set_rate(self, rate):
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+
+    def tick_query_due(self):
+        if self.tick_query_interval <= 0:
+            return False
+        with self._cond:
+            if time.monotonic() - self._last_tick_query < self.tick_query_interval:
+                return False
+            self._last_tick_query = time.monotonic()
+            return True
+
+    def observe_tick_reply(self, reply):
+        match = TICK_PATTERN.search(reply or "")
+        if match:
+            self.observe_tick(float(match.group(1)))
+
+    def snapshot(self):
+        with self._cond:
+            self._refill()
+            return {
+                "enabled": RATE_LIMIT_ENABLED,
+                "rate_per_second": round(self.rate, 1),
+                "min_rate": self.min_rate,
+                "max_rate": self.max_rate,
+                "tokens": round(self.tokens, 1),
+                "burst": self.burst,
+                "latency_ms": round(self.latency_ewma * 1000, 1) if self.latency_ewma is not None else None,
+                "baseline_latency_ms": round(self.latency_baseline * 1000, 1) if self.latency_baseline is not None else None,
+                "target_latency_ms": round(sum(self._latency_target()) * 1000, 1),
+                "mspt": self.last_mspt,
+                "target_mspt": self.target_mspt,
+                "waiting": {LANE_NAMES[lane]: count for lane, count in self._waiting.items()},
+                "stats": dict(self.stats),
+                "pid": os.getpid(),
+                "updated_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+            }
+
+    def restore(self, state):
+        """Resume from a published snapshot: rate, latency baseline/EWMA and last tick time"""
+        with self._cond:
+            if state.get("rate_per_second") is not None:
+                self._set_rate(float(state["rate_per_second"]))
+            if state.get("baseline_latency_ms") is not None:
+                self.latency_baseline = state["baseline_latency_ms"] / 1000
+            if state.get("latency_ms") is not None:
+                self.latency_ewma = state["latency_ms"] / 1000
+            self.last_mspt = state.get("mspt")
+
+    def save_state(self, force=False):
+        """Publish limiter state for the admin GUI (throttled)"""
+        if not self.state_file:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_state_write < STATE_WRITE_INTERVAL:
+            return
+        self._last_state_write = now
+        try:
+            tmp_path = f"{self.state_file}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, self.state_file)
+        except OSError:
+            pass
+
+def load_state(path=STATE_FILE):
+    """Read the last published limiter state, or None if nothing has been written yet"""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def state_age(state):
+    """Seconds since a published state was written, or None if it has no valid timestamp"""
+    try:
+        return time.time() - calendar.timegm(time.strptime(state["updated_at"], '%Y-%m-%dT%H:%M:%SZ'))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_limiter():
+    """Process-wide limiter, or None when RCON_RATE_LIMIT is disabled"""
+    global _limiter
+    if not RATE_LIMIT_ENABLED:
+        return None
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = rate_limiter()
+            state = load_state(_limiter.state_file) if _limiter.state_file else None
+            age = state_age(state) if state else None
+            if STATE_MAX_AGE > 0 and age is not None and age <= STATE_MAX_AGE:
+                _limiter.restore(state)
+            atexit.register(_limiter.save_state, True)
+        return _limiter
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+RCON retry and circuit-breaker policy
+Connecting is retried with bounded exponential backoff and jitter; commands
+themselves are never resent here because a repeated `operation +=` or tellraw
+is not harmless. After RCON_BREAKER_THRESHOLD consecutive failures the breaker
+opens and every call fails fast until a trial call succeeds after the cooldown.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from dotenv import load_dotenv
+from rcon_protocol import RconError, RconUnavailable
+
+load_dotenv()
+RETRY_ATTEMPTS = max(1, int(os.getenv("RCON_RETRY_ATTEMPTS", 3)))
+RETRY_BASE_DELAY = float(os.getenv("RCON_RETRY_BASE_DELAY", 0.5))
+RETRY_MAX_DELAY = float(os.getenv("RCON_RETRY_MAX_DELAY", 5))
+BREAKER_THRESHOLD = max(1, int(os.getenv("RCON_BREAKER_THRESHOLD", 5)))
+BREAKER_COOLDOWN = float(os.getenv("RCON_BREAKER_COOLDOWN", 30))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class RconCircuitOpen(RconError):
+    """Raised without touching the network while the breaker is open"""
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """Full-jitter exponential backoff for the given 0-based retry attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class circuit_breaker():
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self.last_error = None
+        self._opened_at = None
+        self._trial_running = False
+        self._listeners = []
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "rejected": 0, "failures": 0}
+
+    def add_listener(self, listener):
+        """listener(old_state, new_state, breaker) is called after every state change"""
+        self._listeners.append(listener)
+
+    def allow(self):
+        """Raise RconCircuitOpen unless a call may go to the server right now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                transition = self._set_state(HALF_OPEN)
+            elif self.state == HALF_OPEN and not self._trial_running:
+                transition = None
+            else:
+                self.rejected += 1
+                self.stats["rejected"] += 1
+                remaining = max(0, self.cooldown - (time.monotonic() - self._opened_at))
+                raise RconCircuitOpen(f"RCON circuit open ({self.last_error}); retrying in {remaining:.0f}s")
+            self._trial_running = True
+        self._notify(transition)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_running = False
+            transition = self._set_state(CLOSED) if self.state != CLOSED else None
+        self._notify(transition)
+        if transition:
+            with self._lock:
+                self.rejected = 0
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.stats["failures"] += 1
+            self.last_error = error
+            self._trial_running = False
+            transition = None
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.threshold):
+                self._opened_at = time.monotonic()
+                self.stats["opened"] += 1
+                transition = self._set_state(OPEN)
+        self._notify(transition)
+
+    def _set_state(self, state):
+        old, self.state = self.state, state
+        return (old, state)
+
+    def _notify(self, transition):
+        if transition is None:
+            return
+        for listener in self._listeners:
+            try:
+                listener(transition[0], transition[1], self)
+            except Exception:
+                pass
+
+def connect_with_retry(connect, breaker=None, attempts=RETRY_ATTEMPTS):
+    """Call connect(), retrying RconUnavailable with backoff; other errors are raised at once"""
+    for attempt in range(attempts):
+        try:
+            return connect()
+        except RconUnavailable:
+            if attempt == attempts - 1 or (breaker is not None and breaker.state == OPEN):
+                raise
+            time.sleep(backoff_delay(attempt))
+
+async def connect_with_retry_async(connect, breaker=None, attempts=RETRY_ATTEMPTS):
+    """Async variant of connect_with_retry; connect is a coroutine function"""
+    for attempt in range(attempts):
+        try:
+            return await connect()
+        except RconUnavailable:
+            if attempt == attempts - 1 or (breaker is not None and breaker.state == OPEN):
+                raise
+            await asyncio.sleep(backoff_delay(attempt))
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+def get_breaker():
+    """Process-wide breaker shared by the pool and the async client"""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = circuit_breaker()
+        return _breaker
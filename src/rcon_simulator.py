@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Local RCON server simulator
+Speaks the Source RCON protocol like a vanilla server and keeps an in-memory
+scoreboard, so rcon_event_framework, rcon_health_check.py and /api/health/rcon
+can be exercised without a Minecraft server. Latency, reply fragmentation and
+connection failures can be injected for benchmarking.
+
+Usage: python src/rcon_simulator.py --players 500 --online 50 --latency-ms 2
+"""
+import argparse
+import glob
+import os
+import random
+import socketserver
+import struct
+import threading
+import time
+from dotenv import load_dotenv
+from rcon_protocol import (
+    split_packet, SERVERDATA_AUTH, SERVERDATA_AUTH_RESPONSE,
+    SERVERDATA_EXECCOMMAND, SERVERDATA_RESPONSE_VALUE, FRAGMENT_SIZE
+)
+
+load_dotenv()
+
+MAX_PLAYERS = 20
+UNKNOWN_COMMAND = "Unknown or incomplete command, see below for error"
+NO_PLAYER = "No player was found"
+OPERATIONS = {
+    "+=": lambda a, b: a + b,
+    "-=": lambda a, b: a - b,
+    "*=": lambda a, b: a * b,
+    "/=": lambda a, b: a // b if b else a,
+    "%=": lambda a, b: a % b if b else a,
+    "=": lambda a, b: b,
+    "<": min,
+    ">": max,
+}
+
+class scoreboard_model():
+    """In-memory players and scoreboard answering commands with vanilla-style feedback"""
+
+    def __init__(self, players=(), online=(), activity=0, seed=0, datapack_path=None, mspt=5.0):
+        self.players = list(players)
+        self.online = list(online)
+        self.activity = activity
+        self.datapack_path = datapack_path
+        self.mspt = mspt
+        self.objectives = {}
+        self.scores = {}
+        self.display = {}
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+
+    def execute(self, command, executor=None):
+        with self._lock:
+            words = command.strip().split(" ")
+            handler = getattr(self, "_cmd_" + words[0], None)
+            if handler is None:
+                return UNKNOWN_COMMAND
+            try:
+                return handler(words[1:], command, executor)
+            except (ValueError, IndexError):
+                return UNKNOWN_COMMAND
+
+    # -- targets -------------------------------------------------------
+
+    def _targets(self, target, executor):
+        if target == "@a":
+            return list(self.online)
+        if target == "@s":
+            return [executor] if executor else []
+        if target == "*":
+            return list(self.scores)
+        return [target]
+
+    def _tracked(self):
+        """Entities with at least one score, in first-scored order like vanilla"""
+        return [name for name, scores in self.scores.items() if scores]
+
+    def _label(self, objective):
+        return f"[{self.objectives[objective]['display_name']}]"
+
+    # -- commands ------------------------------------------------------
+
+    def _cmd_list(self, args, command, executor):
+        return f"There are {len(self.online)} of a max of {MAX_PLAYERS} players online: {', '.join(self.online)}"
+
+    def _cmd_tellraw(self, args, command, executor):
+        return ""
+
+    def _cmd_playsound(self, args, command, executor):
+        return ""
+
+    def _cmd_particle(self, args, command, executor):
+        return ""
+
+    def _cmd_stopsound(self, args, command, executor):
+        return ""
+
+    def _cmd_reload(self, args, command, executor):
+        return "Reloading!"
+
+    def _cmd_datapack(self, args, command, executor):
+        return f"Enabled datapack {' '.join(args[1:])}"
+
+    def _cmd_tick(self, args, command, executor):
+        return (
+            "The game is running normally\n"
+            "Target tick rate: 20.0 per second.\n"
+            f"Average time per tick: {self.mspt:.1f}ms (Target: 50.0ms)"
+        )
+
+    def _cmd_give(self, args, command, executor):
+        if len(args) < 2:
+            return UNKNOWN_COMMAND
+        targets = [t for t in self._targets(args[0], executor) if t in self.online]
+        if not targets:
+            return NO_PLAYER
+        count = args[2] if len(args) > 2 else "1"
+        item = args[1].split("[")[0]
+        target_text = targets[0] if len(targets) == 1 else f"{len(targets)} players"
+        return f"Gave {count} [{item}] to {target_text}"
+
+    def _cmd_execute(self, args, command, executor):
+        """Supports `execute as <targets> [at @s] run <command>`"""
+        if "run" not in args:
+            return UNKNOWN_COMMAND
+        run_at = args.index("run")
+        executors = [executor]
+        if len(args) > 1 and args[0] == "as":
+            executors = self._targets(args[1], executor)
+        inner = " ".join(args[run_at + 1:])
+        result = ""
+        for each in executors:
+            result = self.execute(inner, each)
+        return result
+
+    def _cmd_function(self, args, command, executor):
+        if not args or ":" not in args[0]:
+            return UNKNOWN_COMMAND
+        namespace, path = args[0].split(":", 1)
+        lines = self._load_function(namespace, path)
+        if lines is None:
+            return f"Unknown function {args[0]}"
+        for line in lines:
+            self.execute(line, executor)
+        return f"Executed {len(lines)} command(s) from function '{args[0]}'"
+
+    def _load_function(self, namespace, path):
+        if not self.datapack_path:
+            return None
+        for function_dir in ("function", "functions"):
+            pattern = os.path.join(self.datapack_path, "*", "data", namespace, function_dir, path + ".mcfunction")
+            for match in glob.glob(pattern):
+                with open(match, "r") as f:
+                    return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        return None
+
+    def _cmd_scoreboard(self, args, command, executor):
+        if len(args) < 2:
+            return UNKNOWN_COMMAND
+        if args[0] == "objectives":
+            return self._objectives(args[1], args[2:], command)
+        if args[0] == "players":
+            return self._players(args[1], args[2:], executor)
+        return UNKNOWN_COMMAND
+
+    def _objectives(self, action, args, command):
+        if action == "add" and len(args) >= 2:
+            name, criteria = args[0], args[1]
+            if name in self.objectives:
+                return "An objective already exists by that name"
+            display_name = " ".join(args[2:]).strip('"') or name
+            self.objectives[name] = {"criteria": criteria, "display_name": display_name}
+            if criteria != "dummy" and self.activity:
+                # Stand in for gameplay: every known player has already scored on stat criteria
+                for player in self.players:
+                    self.scores.setdefault(player, {})[name] = self._random.randint(0, self.activity)
+            return f"Created new objective {self._label(name)}"
+
+        if action == "remove" and args:
+            name = args[0]
+            if name not in self.objectives:
+                return f"Unknown scoreboard objective '{name}'"
+            label = self._label(name)
+            del self.objectives[name]
+            for scores in self.scores.values():
+                scores.pop(name, None)
+            self.display = {slot: obj for slot, obj in self.display.items() if obj != name}
+            return f"Removed objective {label}"
+
+        if action == "setdisplay" and args:
+            slot = args[0]
+            if len(args) == 1:
+                self.display.pop(slot, None)
+                return f"Cleared any objectives in display slot {slot}"
+            if args[1] not in self.objectives:
+                return f"Unknown scoreboard objective '{args[1]}'"
+            self.display[slot] = args[1]
+            return f"Set display slot {slot} to show objective {self._label(args[1])}"
+
+        if action == "modify" and len(args) >= 3:
+            name = args[0]
+            if name not in self.objectives:
+                return f"Unknown scoreboard objective '{name}'"
+            if args[1] == "displayname":
+                self.objectives[name]["display_name"] = " ".join(args[2:])
+                return f"Changed the display name of [{name}] to {self._label(name)}"
+            return f"Changed the render type of objective {self._label(name)}"
+
+        return UNKNOWN_COMMAND
+
+    def _players(self, action, args, executor):
+        if action == "list":
+            tracked = self._tracked()
+            if not tracked:
+                return "There are no tracked entities"
+            return f"There are {len(tracked)} tracked entity/entities: {', '.join(tracked)}"
+
+        if action in ("set", "add", "remove") and len(args) >= 3:
+            objective = args[1]
+            if objective not in self.objectives:
+                return f"Unknown scoreboard objective '{objective}'"
+            value = int(args[2])
+            last = None
+            for target in self._targets(args[0], executor):
+                scores = self.scores.setdefault(target, {})
+                current = scores.get(objective, 0)
+                scores[objective] = {"set": value, "add": current + value, "remove": current - value}[action]
+                last = target
+            if last is None:
+                return NO_PLAYER
+            return f"Set {self._label(objective)} for {last} to {self.scores[last][objective]}"
+
+        if action == "get" and len(args) >= 2:
+            target, objective = args[0], args[1]
+            if objective not in self.objectives:
+                return f"Unknown scoreboard objective '{objective}'"
+            targets = self._targets(target, executor)
+            value = self.scores.get(targets[0], {}).get(objective) if targets else None
+            if value is None:
+                return f"Can't get value of {objective} for {target}; none is set"
+            return f"{targets[0]} has {value} {self._label(objective)}"
+
+        if action == "operation" and len(args) >= 5:
+            target, objective, operation, source, source_objective = args[:5]
+            for name in (objective, source_objective):
+                if name not in self.objectives:
+                    return f"Unknown scoreboard objective '{name}'"
+            if operation not in OPERATIONS:
+                return "Invalid operation"
+            last = None
+            for each in self._targets(target, executor):
+                for each_source in self._targets(source, executor):
+                    scores = self.scores.setdefault(each, {})
+                    source_value = self.scores.setdefault(each_source, {}).setdefault(source_objective, 0)
+                    if operation == "><":
+                        scores[objective], self.scores[each_source][source_objective] = \
+                            source_value, scores.get(objective, 0)
+                    else:
+                        scores[objective] = OPERATIONS[operation](scores.get(objective, 0), source_value)
+                last = each
+            if last is None:
+                return NO_PLAYER
+            return f"Set {self._label(objective)} for {last} to {self.scores[last][objective]}"
+
+        if action == "reset" and args:
+            for target in self._targets(args[0], executor):
+                if len(args) > 1:
+                    self.scores.get(target, {}).pop(args[1], None)
+                else:
+                    self.scores.pop(target, None)
+            return f"Reset scores for {args[0]}"
+
+        return UNKNOWN_COMMAND
+
+class rcon_handler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        server = self.server
+        server.count("connections")
+        authenticated = False
+        buffer = b""
+        while True:
+            try:
+                data = self.request.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            server.count("bytes_in", len(data))
+            buffer += data
+            if len(buffer) < 4:
+                continue
+            (length,) = struct.unpack("<i", buffer[:4])
+            if len(buffer) < 4 + length:
+                continue
+
+            packet, buffer = buffer[4:4 + length], buffer[4 + length:]
+            if buffer and server.vanilla_reads:
+                # Vanilla handles one packet per socket read and discards the rest
+                server.count("dropped_packets")
+                buffer = b""
+
+            request_id, packet_type, payload = split_packet(packet)
+            server.count("packets_in")
+            payload = payload.decode("utf8", errors="replace")
+
+            if packet_type == SERVERDATA_AUTH:
+                authenticated = payload == server.password
+                self._send(request_id if authenticated else -1, SERVERDATA_AUTH_RESPONSE, b"")
+                continue
+            if not authenticated:
+                return
+
+            if packet_type != SERVERDATA_EXECCOMMAND:
+                self._reply(request_id, f"Unknown request {packet_type:x}")
+                continue
+
+            if not self._inject_faults():
+                return
+            server.count("commands")
+            self._reply(request_id, server.model.execute(payload))
+
+    def _inject_faults(self):
+        """Apply configured latency and failures; False means drop the connection"""
+        server = self.server
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000 * (1 + server.jitter * server.random.uniform(-1, 1)))
+        if server.drop_rate and server.random.random() < server.drop_rate:
+            server.count("dropped_connections")
+            return False
+        if server.stall_rate and server.random.random() < server.stall_rate:
+            server.count("stalls")
+            time.sleep(server.stall_seconds)
+        return True
+
+    def _reply(self, request_id, text):
+        payload = text.encode("utf8")
+        size = self.server.fragment_size
+        fragments = [payload[i:i + size] for i in range(0, len(payload), size)] or [b""]
+        for fragment in fragments:
+            self._send(request_id, SERVERDATA_RESPONSE_VALUE, fragment)
+        self.server.count("fragments", len(fragments))
+        self.server.count("replies")
+
+    def _send(self, request_id, packet_type, payload):
+        body = struct.pack("<ii", request_id, packet_type) + payload + b"\x00\x00"
+        packet = struct.pack("<i", len(body)) + body
+        try:
+            self.request.sendall(packet)
+        except OSError:
+            return
+        self.server.count("packets_out")
+        self.server.count("bytes_out", len(packet))
+
+class rcon_simulator(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, password="", model=None, latency_ms=0, jitter=0.0,
+                 fragment_size=FRAGMENT_SIZE, drop_rate=0.0, stall_rate=0.0, stall_seconds=10,
+                 vanilla_reads=True, seed=0):
+        super().__init__((host, port), rcon_handler)
+        self.password = password
+        self.model = model if model is not None else scoreboard_model()
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.fragment_size = max(1, fragment_size)
+        self.drop_rate = drop_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.vanilla_reads = vanilla_reads
+        self.random = random.Random(seed)
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+
+    def reset_stats(self):
+        with self._stats_lock:
+            stats, self.stats = self.stats, {}
+        return stats
+
+    def start(self):
+        """Serve on a background thread; returns self for chaining"""
+        self._thread = threading.Thread(target=self.serve_forever, name="rcon-simulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def player_names(count, prefix="Player"):
+    return [f"{prefix}{i:04d}" for i in range(count)]
+
+def build_simulator(players=10, online=None, activity=100, seed=0, datapack_path=None, **options):
+    """Simulator with `players` tracked names, the first `online` of them connected"""
+    names = player_names(players)
+    online = players if online is None else min(online, players)
+    model = scoreboard_model(names, names[:online], activity=activity, seed=seed, datapack_path=datapack_path)
+    return rcon_simulator(model=model, seed=seed, **options)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local RCON server simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("RCON_PORT", 25575)))
+    parser.add_argument("--password", default=os.getenv("RCON_PASS", ""))
+    parser.add_argument("--players", type=int, default=10, help="players with recorded stats")
+    parser.add_argument("--online", type=int, default=None, help="players online (default: all)")
+    parser.add_argument("--activity", type=int, default=100, help="max random score on stat objectives (0 = none)")
+    parser.add_argument("--datapack-path", default=os.getenv("DATAPACK_PATH"))
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency jitter as a fraction (0-1)")
+    parser.add_argument("--fragment-size", type=int, default=FRAGMENT_SIZE)
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="chance a command drops the connection")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="chance a command stalls before replying")
+    parser.add_argument("--stall-seconds", type=float, default=10)
+    parser.add_argument("--lenient-reads", action="store_true", help="accept several packets per read (non-vanilla)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    simulator = build_simulator(
+        players=args.players, online=args.online, activity=args.activity, seed=args.seed,
+        datapack_path=args.datapack_path, host=args.host, port=args.port, password=args.password,
+        latency_ms=args.latency_ms, jitter=args.jitter, fragment_size=args.fragment_size,
+        drop_rate=args.drop_rate, stall_rate=args.stall_rate, stall_seconds=args.stall_seconds,
+        vanilla_reads=not args.lenient_reads
+    )
+    print(f"RCON simulator listening on {args.host}:{simulator.port} with {args.players} players")
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping RCON simulator")
+        stats = simulator.stats
+        print(", ".join(f"{key}={value}" for key, value in sorted(stats.items())))
+        simulator.server_close()
@@ -2,6 +2,7 @@
 
 #!/usr/bin/python3.12
 import json
+import math
 import os
 from datetime import datetime, timedelta
 import pytz
@@ -21,10 +22,33 @@ except ValueError:
     sql_calendar.log_message("SCOREBOARD_INTERVAL_SECONDS in .env is not an integer. Using default of 600.", "WARN")
 # --------------------------
 
-def schedule_tasks_for_event(event_id, start_time, end_time, scoreboard_interval=DEFAULT_SCOREBOARD_INTERVAL):
-    tasks_scheduled = []
+# Scoreboard displays are a rule on the event (start, end, scoreboard_interval); only this many
+# upcoming occurrences exist as event_tasks rows, and each run tops the window back up.
+SCOREBOARD_LOOKAHEAD = max(1, int(os.getenv("SCOREBOARD_LOOKAHEAD", 1)))
+SCOREBOARD_TASK_NAME = 'server_display_scoreboard'
+SCOREBOARD_TASK_PRIORITY = 4
+
+def unique_event_name(name, start_time):
+    return f"{name.replace(' ','-')}-{start_time.strftime('%m-%d-%Y-%H%M')}"
+
+def scoreboard_times(start_time, end_time, scoreboard_interval, after, count=SCOREBOARD_LOOKAHEAD):
+    """The next count display times strictly after 'after': start + k * interval, k >= 1, before end_time"""
+    if not scoreboard_interval or scoreboard_interval <= 0:
+        return []
+    interval = timedelta(seconds=scoreboard_interval)
+    k = max(1, math.floor((after - start_time) / interval) + 1)
+    times = []
+    next_display_time = start_time + k * interval
+    while next_display_time < end_time and len(times) < count:
+        times.append(next_display_time)
+        next_display_time += interval
+    return times
+
+def build_tasks(start_time, end_time, scoreboard_interval=DEFAULT_SCOREBOARD_INTERVAL, now=None):
+    """The (task_name, scheduled_time, priority) tuples for an event, skipping times already passed"""
+    tasks = []
     # Ensure 'now' is a timezone-aware UTC datetime for comparison
-    now = datetime.now(pytz.UTC)
+    now = now or datetime.now(pytz.UTC)
     
     # -------------------------------------------------------------------
     # DISCORD NOTIFICATION TASKS - Using consistent naming
@@ -33,57 +57,77 @@ def schedule_tasks_for_event(event_id, start_time, end_time, scoreboard_interval
     # 24-Hour Notification - Priority 2
     notify_24h_time = start_time - timedelta(hours=24)
     if notify_24h_time > now:
-        sql_calendar.insert_task(event_id, 'discord_twentyfour_notify', notify_24h_time, 2)
-        tasks_scheduled.append('discord_twentyfour_notify')
+        tasks.append(('discord_twentyfour_notify', notify_24h_time, 2))
 
     # 30-Minute Notification - Priority 2
     notify_30min_time = start_time - timedelta(minutes=30)
     if notify_30min_time > now:
-        sql_calendar.insert_task(event_id, 'discord_thirty_notify', notify_30min_time, 2)
-        tasks_scheduled.append('discord_thirty_notify')
+        tasks.append(('discord_thirty_notify', notify_30min_time, 2))
 
     # Start Notification - Priority 4 (before server starts at priority 5)
     if start_time > now:
-        sql_calendar.insert_task(event_id, 'discord_now_notify', start_time, 4)
-        tasks_scheduled.append('discord_now_notify')
+        tasks.append(('discord_now_notify', start_time, 4))
 
     # Server start event (exactly at start_time) - Priority 5
     if start_time > now:
-        sql_calendar.insert_task(event_id, 'server_start_event', start_time, 5)
-        tasks_scheduled.append('server_start_event')
+        tasks.append(('server_start_event', start_time, 5))
     
     # Server end event (exactly at end_time) - Priority 5
-    sql_calendar.insert_task(event_id, 'server_end_event', end_time, 5)
-    tasks_scheduled.append('server_end_event')
+    tasks.append(('server_end_event', end_time, 5))
     
     # -------------------------------------------------------------------
     # Scoreboard Display Tasks - Using consistent naming
     # -------------------------------------------------------------------
     
-    # The first display task should happen at start_time + scoreboard_interval
-    next_display_time = start_time + timedelta(seconds=scoreboard_interval)
-    
-    # Loop while the next scheduled time is before the event ends
-    while next_display_time < end_time:
-        
-        # Only schedule tasks that have NOT passed yet.
-        if next_display_time > now:
-            # FIXED: Using consistent task name
-            sql_calendar.insert_task(event_id, 'server_display_scoreboard', next_display_time, 4)
-            tasks_scheduled.append('server_display_scoreboard')
-
-        # Increment the time by the interval
-        next_display_time += timedelta(seconds=scoreboard_interval)
+    # The first display task should happen at start_time + scoreboard_interval; only the
+    # look-ahead window is created here, top_up_scoreboard_tasks adds the rest as they run
+    for display_time in scoreboard_times(start_time, end_time, scoreboard_interval, now):
+        tasks.append((SCOREBOARD_TASK_NAME, display_time, SCOREBOARD_TASK_PRIORITY))
 
     # -------------------------------------------------------------------
     
     # Results Notification - Priority 3
     notify_results = end_time + timedelta(minutes=5)
-    sql_calendar.insert_task(event_id, 'discord_over_notify', notify_results, 3)
-    tasks_scheduled.append('discord_over_notify')
+    tasks.append(('discord_over_notify', notify_results, 3))
     
-    sql_calendar.log_message(f"Scheduled {len(tasks_scheduled)} tasks for event {event_id}")
-    return tasks_scheduled
+    return tasks
+
+
+def schedule_tasks_for_event(event_id, start_time, end_time, scoreboard_interval=DEFAULT_SCOREBOARD_INTERVAL):
+    # All tasks go in with one executemany and one commit
+    tasks = build_tasks(start_time, end_time, scoreboard_interval)
+    sql_calendar.insert_tasks(event_id, tasks)
+    sql_calendar.log_message(f"Scheduled {len(tasks)} tasks for event {event_id}")
+    return [task_name for task_name, _, _ in tasks]
+
+
+def top_up_scoreboard_tasks(event_id, now=None, after=None):
+    """Schedule display occurrences until SCOREBOARD_LOOKAHEAD are pending; returns how many were added.
+    after skips occurrences up to that time, e.g. one whose task was just deleted."""
+    now = now or datetime.now(pytz.UTC)
+    with sql_calendar.get_db().transaction(immediate=True):
+        rule = sql_calendar.get_scoreboard_rule(event_id)
+        if rule is None:
+            return 0
+        start_time, end_time, scoreboard_interval = rule
+        pending = sql_calendar.get_pending_task_times(event_id, SCOREBOARD_TASK_NAME)
+        missing = SCOREBOARD_LOOKAHEAD - len(pending)
+        if missing <= 0:
+            return 0
+        # Missed occurrences are not replayed: the next one is after now and after anything still queued
+        times = scoreboard_times(start_time, end_time, scoreboard_interval, max([now, after or now] + pending), missing)
+        sql_calendar.insert_tasks(event_id, [(SCOREBOARD_TASK_NAME, t, SCOREBOARD_TASK_PRIORITY) for t in times])
+    return len(times)
+
+
+def change_scoreboard_interval(event_id, scoreboard_interval):
+    """Apply a new interval to an event; only its pending display tasks are replaced"""
+    with sql_calendar.get_db().transaction(immediate=True):
+        if not sql_calendar.update_scoreboard_interval(event_id, scoreboard_interval, SCOREBOARD_TASK_NAME):
+            return False
+        added = top_up_scoreboard_tasks(event_id)
+    sql_calendar.log_message(f"Scoreboard interval for event {event_id} set to {scoreboard_interval}s, next {added} display task(s) scheduled")
+    return True
 
 
 def create_event_with_tasks(unique_name, name, event_json, description, start_time_str, end_time_str, scoreboard_interval=DEFAULT_SCOREBOARD_INTERVAL):
@@ -92,21 +136,16 @@ def create_event_with_tasks(unique_name, name, event_json, description, start_ti
         start_time = datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
         end_time = datetime.fromisoformat(end_time_str.replace('Z', '+00:00'))
         
-        # Insert event
+        # The event and its tasks are written in one transaction, and the id comes from that
+        # INSERT (lastrowid), so a concurrent insert cannot hand us someone else's event.
         # This will use the value passed by the caller, or the DEFAULT_SCOREBOARD_INTERVAL if the caller doesn't provide it.
-        sql_calendar.insert_event(unique_name, name, event_json, description, start_time_str, end_time_str, scoreboard_interval)
-        
-        # Get the event ID
-        event_id = sql_calendar.get_last_event_id()
+        tasks = build_tasks(start_time, end_time, scoreboard_interval)
+        event_id = sql_calendar.insert_event_with_tasks(
+            unique_name, name, event_json, description, start_time_str, end_time_str, scoreboard_interval, tasks
+        )
         
-        if event_id:
-            # Schedule tasks for the event
-            tasks = schedule_tasks_for_event(event_id, start_time, end_time, scoreboard_interval)
-            sql_calendar.log_message(f"Created event '{name}' with {len(tasks)} scheduled tasks")
-            return event_id
-        else:
-            sql_calendar.log_message(f"Failed to get event ID for '{name}'", "ERROR")
-            return None
+        sql_calendar.log_message(f"Created event '{name}' with {len(tasks)} scheduled tasks")
+        return event_id
             
     except Exception as e:
         sql_calendar.log_message(f"Error creating event with tasks: {e}", "ERROR")
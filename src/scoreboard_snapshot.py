@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Scoreboard snapshots
+Reads every tracked player's score for an objective in one RCON batch and keeps
+the result as a per-objective score table that the rest of an action reads from.
+"""
+import re
+import time
+
+SCORE_PATTERN = re.compile(r"has (-?\d+)")
+TRACKED_HEADER_PATTERN = re.compile(r"There are (\d+) tracked entit(?:y/entities|ies|y): ")
+NO_TRACKED_TEXT = "There are no tracked entities"
+NAME_SEPARATOR = ", "
+
+class tracked_list_parser():
+    """Incrementally parse a `scoreboard players list` reply fed one fragment at a time"""
+
+    def __init__(self):
+        self.declared = None
+        self.names = []
+        self.chunks = 0
+        self._carry = ""
+
+    def feed(self, chunk):
+        self.chunks += 1
+        text = self._carry + chunk
+        if self.declared is None:
+            match = TRACKED_HEADER_PATTERN.search(text)
+            if match is None:
+                if NO_TRACKED_TEXT in text:
+                    self.declared = 0
+                    text = ""
+                # Header not complete yet; only its tail can still match
+                self._carry = text[-128:]
+                return
+            self.declared = int(match.group(1))
+            text = text[match.end():]
+
+        # The last piece may be a name cut at a fragment boundary; finish it with the next chunk
+        parts = text.split(NAME_SEPARATOR)
+        self._carry = parts.pop()
+        self.names.extend(parts)
+
+    def close(self):
+        """Flush the final name and return every parsed name in reply order"""
+        if self.declared is not None and self._carry.strip():
+            self.names.append(self._carry.strip())
+        self._carry = ""
+        return self.names
+
+    @property
+    def parsed(self):
+        return self.declared is not None
+
+    @property
+    def complete(self):
+        """True when the number of names matches the count the server announced"""
+        return self.declared is not None and self.declared == len(self.names)
+
+class score_table():
+
+    def __init__(self, objective, scores, missing=()):
+        self.objective = objective
+        self.scores = scores
+        self.missing = tuple(missing)
+        self.taken_at = time.time()
+
+    def __len__(self):
+        return len(self.scores)
+
+    def get(self, player, default=None):
+        return self.scores.get(player, default)
+
+    def leaders(self):
+        """Return (players sharing the top score, top score) in tracked-list order"""
+        if not self.scores:
+            return [], 0
+        top_score = max(self.scores.values())
+        return [player for player, score in self.scores.items() if score == top_score], top_score
+
+    @classmethod
+    def from_replies(cls, objective, players, replies):
+        """Build a table from `scoreboard players get` replies, one per player"""
+        scores = {}
+        missing = []
+        for player, reply in zip(players, replies):
+            match = SCORE_PATTERN.search(reply or "")
+            if match:
+                scores[player] = int(match.group(1))
+            else:
+                missing.append(player)
+        return cls(objective, scores, missing)
+
+def score_commands(objective, players):
+    return [f"scoreboard players get {player} {objective}" for player in players]
+
+_snapshots = {}
+
+def get_cached(objective):
+    return _snapshots.get(objective)
+
+def store(table):
+    _snapshots[table.objective] = table
+    return table
+
+def invalidate(objective=None):
+    """Drop one objective's snapshot, or all of them"""
+    if objective is None:
+        _snapshots.clear()
+    else:
+        _snapshots.pop(objective, None)
@@ -1,8 +1,11 @@
 #!/usr/bin/python3.12
 import os
+import sys
 from dotenv import load_dotenv
 from datetime import datetime, timezone, timedelta
 from database_manager import db_manager
+import log_writer
+import log_policy
 
 load_dotenv()
 DATABASE_FILE = os.getenv("DATABASE_FILE")
@@ -12,8 +15,17 @@ DATABASE_SCHEMA = os.getenv("DATABASE_SCHEMA")
 SCHEMA_PATH = f"{DATABASE_DIR}{DATABASE_SCHEMA}"
 DATABASE_PATH = f"{DATABASE_DIR}{DATABASE_FILE}"
 
+_db = None
+
+def get_db():
+    """Module-wide db_manager; its connections are reused per thread"""
+    global _db
+    if _db is None:
+        _db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    return _db
+
 def insert_task(event_id, task_name, scheduled_time, priority):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     timestamp = scheduled_time.strftime('%Y-%m-%dT%H:%M:%SZ')
     query = """
     INSERT INTO event_tasks (event_id, task_name, scheduled_time, priority)
@@ -21,27 +33,92 @@ def insert_task(event_id, task_name, scheduled_time, priority):
     """
     return db.db_query_with_params(query, (event_id, task_name, timestamp, priority))
 
+def insert_tasks(event_id, tasks):
+    """Insert (task_name, scheduled_time, priority) tuples in one transaction; joins the caller's if any"""
+    db = get_db()
+    query = """
+    INSERT INTO event_tasks (event_id, task_name, scheduled_time, priority)
+    VALUES (?, ?, ?, ?);
+    """
+    rows = [
+        (event_id, task_name, scheduled_time.strftime('%Y-%m-%dT%H:%M:%SZ'), priority)
+        for task_name, scheduled_time, priority in tasks
+    ]
+    with db.transaction(immediate=True) as db_conn:
+        db_conn.executemany(query, rows)
+    return len(rows)
+
 def delete_task(task_id):
     """Delete a task by its ID"""
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = """
     DELETE FROM event_tasks WHERE id = ? AND completed = 0;
     """
     try:
-        db_conn = db.db_connect()
-        cursor = db_conn.cursor()
-        cursor.execute(query, (task_id,))
+        with db.transaction(immediate=True) as db_conn:
+            cursor = db_conn.execute(query, (task_id,))
         affected_rows = cursor.rowcount
-        db_conn.commit()
-        cursor.close()
-        db_conn.close()
         return affected_rows > 0
     except Exception as e:
         log_message(f"Error deleting task {task_id}: {e}", "ERROR")
         return False
 
+def delete_pending_tasks(event_id, task_name):
+    """Delete an event's not-yet-run tasks with the given name"""
+    db = get_db()
+    query = """
+    DELETE FROM event_tasks WHERE event_id = ? AND task_name = ? AND completed = 0;
+    """
+    try:
+        with db.transaction(immediate=True) as db_conn:
+            cursor = db_conn.execute(query, (event_id, task_name))
+        affected_rows = cursor.rowcount
+        return affected_rows
+    except Exception as e:
+        log_message(f"Error deleting pending {task_name} tasks for event {event_id}: {e}", "ERROR")
+        return 0
+
+def get_pending_task_times(event_id, task_name):
+    """Scheduled times of an event's not-yet-run tasks with the given name, earliest first"""
+    db = get_db()
+    query = """
+    SELECT scheduled_time FROM event_tasks
+    WHERE event_id = ? AND task_name = ? AND completed = 0
+    ORDER BY scheduled_time ASC;
+    """
+    result = db.db_query_with_params(query, (event_id, task_name))
+    return [datetime.fromisoformat(row[0].replace('Z', '+00:00')) for row in result or []]
+
+def get_scoreboard_rule(event_id):
+    """(start_time, end_time, scoreboard_interval) of an event that has not ended, else None"""
+    db = get_db()
+    query = """
+    SELECT start_time, end_time, scoreboard_interval FROM events
+    WHERE id = ? AND event_over = 0;
+    """
+    result = db.db_query_with_params(query, (event_id,))
+    if not result:
+        return None
+    start_time, end_time, interval = result[0]
+    return (
+        datetime.fromisoformat(start_time.replace('Z', '+00:00')),
+        datetime.fromisoformat(end_time.replace('Z', '+00:00')),
+        interval
+    )
+
+def update_scoreboard_interval(event_id, seconds, task_name):
+    """Change an event's scoreboard interval and drop its pending display tasks; joins the caller's transaction"""
+    db = get_db()
+    with db.transaction(immediate=True) as db_conn:
+        cursor = db_conn.execute("UPDATE events SET scoreboard_interval = ? WHERE id = ?;", (seconds, event_id))
+        db_conn.execute(
+            "DELETE FROM event_tasks WHERE event_id = ? AND task_name = ? AND completed = 0;",
+            (event_id, task_name)
+        )
+    return cursor.rowcount > 0
+
 def get_next_pending_task_time():
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = """
     SELECT scheduled_time 
     FROM event_tasks 
@@ -55,7 +132,7 @@ def get_next_pending_task_time():
     return None
 
 def get_tasks_to_execute(current_time, window_seconds):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     current_iso = current_time.strftime('%Y-%m-%dT%H:%M:%SZ')
     window_time = (current_time + timedelta(seconds=window_seconds)).strftime('%Y-%m-%dT%H:%M:%SZ')
     
@@ -68,7 +145,24 @@ def get_tasks_to_execute(current_time, window_seconds):
     ORDER BY t.priority DESC, t.scheduled_time ASC;
     """
     results = db.db_query_with_params(query, (window_time,))
-    
+    return _task_dicts(results)
+
+def get_pending_tasks():
+    """Every task not yet run, with its event's names and JSON, for the event handler's in-memory queue"""
+    db = get_db()
+    query = """
+    SELECT t.*, e.unique_event_name, e.name, e.event_json
+    FROM event_tasks t
+    JOIN events e ON t.event_id = e.id
+    WHERE t.completed = 0
+    ORDER BY t.scheduled_time ASC;
+    """
+    results = db.db_query(query)
+    if results is None:
+        raise RuntimeError("Could not load pending tasks")
+    return _task_dicts(results)
+
+def _task_dicts(results):
     tasks = []
     for row in results:
         tasks.append({
@@ -83,8 +177,14 @@ def get_tasks_to_execute(current_time, window_seconds):
         })
     return tasks
 
+def is_task_pending(task_id):
+    """False once a task has run or been deleted"""
+    db = get_db()
+    result = db.db_query_with_params("SELECT 1 FROM event_tasks WHERE id = ? AND completed = 0;", (task_id,))
+    return bool(result)
+
 def mark_task_completed(task_id, execution_length_ms):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     completed_time = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
     query = """
     UPDATE event_tasks
@@ -94,19 +194,15 @@ def mark_task_completed(task_id, execution_length_ms):
     WHERE id = ?;
     """
     try:
-        db_conn = db.db_connect()
-        cursor = db_conn.cursor()
-        cursor.execute(query, (execution_length_ms, completed_time, task_id))
-        db_conn.commit()
-        cursor.close()
-        db_conn.close()
+        with db.transaction(immediate=True) as db_conn:
+            cursor = db_conn.execute(query, (execution_length_ms, completed_time, task_id))
         return True
     except Exception as e:
         log_message(f"Error marking task {task_id} completed: {e}", "ERROR")
         return False
 
 def get_all_tasks():
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = """
     SELECT t.*, e.unique_event_name
     FROM event_tasks t
@@ -130,7 +226,7 @@ def get_all_tasks():
     return tasks
 
 def find_missing_24h_notif():
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     missing_24_query = """
     SELECT e.*
     FROM events e
@@ -145,7 +241,7 @@ def find_missing_24h_notif():
     return db.db_query(missing_24_query)
 
 def find_missing_30m_notif():
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     missing_30_query = """
     SELECT e.*
     FROM events e
@@ -160,7 +256,7 @@ def find_missing_30m_notif():
     return db.db_query(missing_30_query)
 
 def find_missing_now_notif():
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     missing_start_now_notif_query = """
     SELECT e.*
     FROM events e
@@ -175,7 +271,7 @@ def find_missing_now_notif():
     return db.db_query(missing_start_now_notif_query)
 
 def events_needing_started():
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     events_needing_started_query = """
     SELECT *
     FROM events
@@ -186,7 +282,7 @@ def events_needing_started():
     return db.db_query(events_needing_started_query)
 
 def events_needing_ending():
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     events_needing_ending_query = """
     SELECT *
     FROM events
@@ -196,8 +292,18 @@ def events_needing_ending():
     """
     return db.db_query(events_needing_ending_query)
 
+def get_unfinished_event_ids():
+    db = get_db()
+    query = """
+    SELECT id FROM events
+    WHERE event_over = 0
+    AND end_time > strftime('%Y-%m-%dT%H:%M:%SZ', 'now');
+    """
+    result = db.db_query(query)
+    return [row[0] for row in result or []]
+
 def events_needing_scoreboard_display():
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     events_need_display_query = """
     SELECT *
     FROM events
@@ -208,7 +314,7 @@ def events_needing_scoreboard_display():
     return db.db_query(events_need_display_query)
 
 def start_event_by_id(event_id):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     start_event_query = """
     UPDATE events
     SET event_in_progress = 1,
@@ -216,13 +322,9 @@ def start_event_by_id(event_id):
     WHERE id = ?;
     """
     try:
-        db_conn = db.db_connect()
-        cursor = db_conn.cursor()
-        cursor.execute(start_event_query, (event_id,))
-        db_conn.commit()
+        with db.transaction(immediate=True) as db_conn:
+            cursor = db_conn.execute(start_event_query, (event_id,))
         affected_rows = cursor.rowcount
-        cursor.close()
-        db_conn.close()
         log_message(f"Event {event_id} marked as started (affected {affected_rows} rows)")
         return affected_rows > 0
     except Exception as e:
@@ -230,7 +332,7 @@ def start_event_by_id(event_id):
         return False
 
 def end_event_by_id(event_id):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     end_event_query = """
     UPDATE events
     SET event_in_progress = 0,
@@ -238,13 +340,9 @@ def end_event_by_id(event_id):
     WHERE id = ?;
     """
     try:
-        db_conn = db.db_connect()
-        cursor = db_conn.cursor()
-        cursor.execute(end_event_query, (event_id,))
-        db_conn.commit()
+        with db.transaction(immediate=True) as db_conn:
+            cursor = db_conn.execute(end_event_query, (event_id,))
         affected_rows = cursor.rowcount
-        cursor.close()
-        db_conn.close()
         log_message(f"Event {event_id} marked as ended (affected {affected_rows} rows)")
         return affected_rows > 0
     except Exception as e:
@@ -252,7 +350,7 @@ def end_event_by_id(event_id):
         return False
 
 def update_scoreboard_display_time(event_id):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     current_time = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
     update_query = """
     UPDATE events
@@ -260,20 +358,16 @@ def update_scoreboard_display_time(event_id):
     WHERE id = ?;
     """
     try:
-        db_conn = db.db_connect()
-        cursor = db_conn.cursor()
-        cursor.execute(update_query, (current_time, event_id))
-        db_conn.commit()
+        with db.transaction(immediate=True) as db_conn:
+            cursor = db_conn.execute(update_query, (current_time, event_id))
         affected_rows = cursor.rowcount
-        cursor.close()
-        db_conn.close()
         return affected_rows > 0
     except Exception as e:
         log_message(f"Error updating scoreboard time for event {event_id}: {e}", "ERROR")
         return False
 
 def send_24h_notification(event_id):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = """
     INSERT INTO event_notifications (event_id, notification_type)
     VALUES (?, '24h');
@@ -281,7 +375,7 @@ def send_24h_notification(event_id):
     return db.db_query_with_params(query, (event_id,))
 
 def send_30min_notification(event_id):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = """
     INSERT INTO event_notifications (event_id, notification_type)
     VALUES (?, '30min');
@@ -289,7 +383,7 @@ def send_30min_notification(event_id):
     return db.db_query_with_params(query, (event_id,))
 
 def send_start_notification(event_id):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = """
     INSERT INTO event_notifications (event_id, notification_type)
     VALUES (?, 'start');
@@ -297,7 +391,7 @@ def send_start_notification(event_id):
     return db.db_query_with_params(query, (event_id,))
 
 def send_end_notification(event_id):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = """
     INSERT INTO event_notifications (event_id, notification_type)
     VALUES (?, 'end');
@@ -305,7 +399,7 @@ def send_end_notification(event_id):
     return db.db_query_with_params(query, (event_id,))
 
 def get_event_by_id(event_id):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = """
     SELECT * FROM events WHERE id = ?;
     """
@@ -313,54 +407,139 @@ def get_event_by_id(event_id):
     return result[0] if result else None
 
 def insert_event(unique_name, name, event_json, description, start_time, end_time, scoreboard_interval=600):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = """
     INSERT INTO events (unique_event_name, name, event_json, description, start_time, end_time, scoreboard_interval)
     VALUES (?, ?, ?, ?, ?, ?, ?);
     """
     return db.db_query_with_params(query, (unique_name, name, event_json, description, start_time, end_time, scoreboard_interval))
 
-def log_message(message, level="INFO"):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
-    timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+def insert_event_with_tasks(unique_name, name, event_json, description, start_time, end_time, scoreboard_interval, tasks, series_id=None):
+    """Insert an event and its tasks atomically; returns the new event id. Raises on failure, leaving nothing behind"""
+    db = get_db()
     query = """
-    INSERT INTO logs (timestamp, message, log_level)
-    VALUES (?, ?, ?);
+    INSERT INTO events (unique_event_name, name, event_json, description, start_time, end_time, scoreboard_interval, series_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?);
     """
-    return db.db_query_with_params(query, (timestamp, message, level))
+    with db.transaction(immediate=True) as db_conn:
+        cursor = db_conn.execute(query, (unique_name, name, event_json, description, start_time, end_time, scoreboard_interval, series_id))
+        event_id = cursor.lastrowid
+        insert_tasks(event_id, tasks)
+    return event_id
 
-def log_message_with_timestamp(message, level="INFO", timestamp=None):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
-    if not timestamp:
-        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+SERIES_COLUMNS = (
+    "id", "name", "event_json", "description", "timezone", "first_start", "duration_seconds", "frequency",
+    "interval_count", "occurrence_limit", "until_time", "scoreboard_interval", "next_occurrence", "created_at"
+)
+
+def insert_series(name, event_json, description, timezone_name, first_start, duration_seconds, frequency,
+                  interval_count=1, occurrence_limit=None, until_time=None, scoreboard_interval=600):
+    """Insert a recurring event rule; returns the new series id"""
+    db = get_db()
     query = """
-    INSERT INTO logs (timestamp, message, log_level)
-    VALUES (?, ?, ?);
+    INSERT INTO event_series (name, event_json, description, timezone, first_start, duration_seconds, frequency,
+                              interval_count, occurrence_limit, until_time, scoreboard_interval)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
     """
-    return db.db_query_with_params(query, (timestamp, message, level))
+    with db.transaction(immediate=True) as db_conn:
+        cursor = db_conn.execute(query, (name, event_json, description, timezone_name, first_start, duration_seconds,
+                                         frequency, interval_count, occurrence_limit, until_time, scoreboard_interval))
+    return cursor.lastrowid
+
+def get_all_series():
+    db = get_db()
+    query = f"SELECT {', '.join(SERIES_COLUMNS)} FROM event_series ORDER BY id;"
+    result = db.db_query(query)
+    return [dict(zip(SERIES_COLUMNS, row)) for row in result or []]
+
+def get_series(series_id):
+    db = get_db()
+    query = f"SELECT {', '.join(SERIES_COLUMNS)} FROM event_series WHERE id = ?;"
+    result = db.db_query_with_params(query, (series_id,))
+    return dict(zip(SERIES_COLUMNS, result[0])) if result else None
+
+def set_series_next_occurrence(series_id, next_occurrence):
+    db = get_db()
+    query = "UPDATE event_series SET next_occurrence = ? WHERE id = ?;"
+    with db.transaction(immediate=True) as db_conn:
+        db_conn.execute(query, (next_occurrence, series_id))
+
+def delete_series(series_id):
+    """Delete a series and its events that have not started; started events are kept and detached"""
+    db = get_db()
+    upcoming = "SELECT id FROM events WHERE series_id = ? AND event_started = 0"
+    with db.transaction(immediate=True) as db_conn:
+        db_conn.execute(f"DELETE FROM event_tasks WHERE event_id IN ({upcoming});", (series_id,))
+        db_conn.execute(f"DELETE FROM event_notifications WHERE event_id IN ({upcoming});", (series_id,))
+        deleted = db_conn.execute("DELETE FROM events WHERE series_id = ? AND event_started = 0;", (series_id,)).rowcount
+        db_conn.execute("UPDATE events SET series_id = NULL WHERE series_id = ?;", (series_id,))
+        cursor = db_conn.execute("DELETE FROM event_series WHERE id = ?;", (series_id,))
+    return deleted if cursor.rowcount else None
+
+def log_message(message, level="INFO", module=None):
+    """Queue a log row if the calling module logs at this level; log_writer commits queued rows in batches"""
+    if log_enabled(level, module or _caller_module()):
+        log_writer.get_writer(DATABASE_PATH).write(message, level)
+    return []
+
+def log_message_with_timestamp(message, level="INFO", timestamp=None, module=None):
+    if log_enabled(level, module or _caller_module()):
+        log_writer.get_writer(DATABASE_PATH).write(message, level, timestamp)
+    return []
+
+def log_enabled(level, module=None):
+    """Check before building expensive TRACE/DEBUG messages"""
+    return log_policy.get_policy(DATABASE_PATH).enabled(level, module or _caller_module())
+
+def _module_name(frame):
+    return os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+
+def _caller_module():
+    # Two frames up is whoever called log_message (or log_to_sql in the framework); rows this
+    # module logs itself belong to whoever called into it, so their level is set per caller
+    frame = sys._getframe(2)
+    while frame.f_back is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    return _module_name(frame)
+
+def flush_logs():
+    """Write queued log rows now, e.g. before reading them back"""
+    log_writer.get_writer(DATABASE_PATH).flush()
 
 def update_scoreboard_time(event_id, timestamp):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = """
     UPDATE events
     SET last_scoreboard_time = ?
     WHERE id = ?;
     """
     try:
-        db_conn = db.db_connect()
-        cursor = db_conn.cursor()
-        cursor.execute(query, (timestamp, event_id))
-        db_conn.commit()
+        with db.transaction(immediate=True) as db_conn:
+            cursor = db_conn.execute(query, (timestamp, event_id))
         affected_rows = cursor.rowcount
-        cursor.close()
-        db_conn.close()
         return affected_rows > 0
     except Exception as e:
         log_message(f"Error updating scoreboard time: {e}", "ERROR")
         return False
 
+def update_scoreboard_seconds(event_id, seconds):
+    db = get_db()
+    query = """
+    UPDATE events
+    SET last_scoreboard_seconds = ?
+    WHERE id = ?;
+    """
+    try:
+        with db.transaction(immediate=True) as db_conn:
+            cursor = db_conn.execute(query, (seconds, event_id))
+        affected_rows = cursor.rowcount
+        return affected_rows > 0
+    except Exception as e:
+        log_message(f"Error updating scoreboard on-screen time: {e}", "ERROR")
+        return False
+
 def get_event_id_by_unique_name(unique_name):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = """
     SELECT id FROM events WHERE unique_event_name = ?;
     """
@@ -368,7 +547,7 @@ def get_event_id_by_unique_name(unique_name):
     return result[0][0] if result else None
 
 def insert_winner(event_id, player_name, final_score, was_online):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
     query = """
     INSERT INTO event_winners (event_id, player_name, final_score, was_online, rewarded_at)
@@ -377,14 +556,35 @@ def insert_winner(event_id, player_name, final_score, was_online):
     return db.db_query_with_params(query, (event_id, player_name, final_score, 1 if was_online else 0, timestamp))
 
 def get_event_winners(event_id):
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = """
     SELECT * FROM event_winners WHERE event_id = ?;
     """
     return db.db_query_with_params(query, (event_id,))
 
 def get_last_event_id():
-    db = db_manager(DATABASE_PATH, SCHEMA_PATH)
+    db = get_db()
     query = "SELECT id FROM events ORDER BY id DESC LIMIT 1;"
     result = db.db_query(query)
-    return result[0][0] if result else None
\ No newline at end of file
+    return result[0][0] if result else None
+
+def get_log_settings():
+    """Per-module log level overrides as {module: level}"""
+    db = get_db()
+    result = db.db_query("SELECT module, level FROM log_settings ORDER BY module")
+    return {module: level for module, level in result} if result else {}
+
+def set_log_level(module, level):
+    """Override a module's log level; a falsy level removes the override"""
+    db = get_db()
+    if level:
+        query = """
+        INSERT INTO log_settings (module, level, updated_at)
+        VALUES (?, ?, strftime('%Y-%m-%dT%H:%M:%SZ','now'))
+        ON CONFLICT(module) DO UPDATE SET level = excluded.level, updated_at = excluded.updated_at;
+        """
+        result = db.db_query_with_params(query, (module, level))
+    else:
+        result = db.db_query_with_params("DELETE FROM log_settings WHERE module = ?;", (module,))
+    log_policy.get_policy(DATABASE_PATH).invalidate()
+    return result is not None
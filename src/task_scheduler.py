@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+In-memory task queue for the event handler
+Pending event_tasks rows are loaded once into a heap ordered by scheduled time
+and the handler sleeps until the earliest one is due. Triggers bump
+task_queue_version whenever a task is added, removed or rescheduled; the
+scheduler watches PRAGMA data_version (which only changes when another
+connection commits) and reloads when that version moved, so a task created from
+the web UI is picked up within SCHEDULER_WAKE_POLL seconds and an idle handler
+reads nothing but data_version.
+"""
+import heapq
+import os
+import threading
+import time
+from dotenv import load_dotenv
+import database_manager
+import sql_calendar
+
+load_dotenv()
+SCHEDULER_WAKE_POLL = float(os.getenv("SCHEDULER_WAKE_POLL", 0.25))
+# Reload even without a change, e.g. after the database file was restored from a backup
+SCHEDULER_RESYNC_SECONDS = float(os.getenv("SCHEDULER_RESYNC_SECONDS", 300))
+
+TRACKING_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS task_queue_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO task_queue_version (id, version) VALUES (1, 0)",
+    """CREATE TRIGGER IF NOT EXISTS task_queue_insert AFTER INSERT ON event_tasks BEGIN
+        UPDATE task_queue_version SET version = version + 1 WHERE id = 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS task_queue_delete AFTER DELETE ON event_tasks BEGIN
+        UPDATE task_queue_version SET version = version + 1 WHERE id = 1;
+    END""",
+    # Completing a task is not a change: the handler that completed it already dropped it
+    """CREATE TRIGGER IF NOT EXISTS task_queue_update
+    AFTER UPDATE OF event_id, task_name, scheduled_time, priority ON event_tasks BEGIN
+        UPDATE task_queue_version SET version = version + 1 WHERE id = 1;
+    END""",
+)
+
+def ensure_tracking(db_conn):
+    """Create task_queue_version and its triggers if missing"""
+    with db_conn:
+        for statement in TRACKING_SCHEMA:
+            db_conn.execute(statement)
+
+class task_scheduler():
+
+    def __init__(self, database_path, wake_poll=SCHEDULER_WAKE_POLL, resync_seconds=SCHEDULER_RESYNC_SECONDS):
+        self.database_path = database_path
+        self.wake_poll = wake_poll
+        self.resync_seconds = resync_seconds
+        self.stats = {"loads": 0, "polls": 0}
+        self._heap = []
+        self._wake = threading.Event()
+        self._db_conn = None
+        self._data_version = None
+        self._queue_version = None
+        self._loaded_at = None
+
+    def load(self):
+        """Replace the queue with every pending task"""
+        # Read the version first: a change made during the load is seen by the next changed()
+        self._queue_version = self._read_queue_version()
+        tasks = sql_calendar.get_pending_tasks()
+        self._heap = [(task['scheduled_time'], -task['priority'], task['id'], task) for task in tasks]
+        heapq.heapify(self._heap)
+        self._loaded_at = time.monotonic()
+        self.stats["loads"] += 1
+        return len(self._heap)
+
+    def refresh(self):
+        """Reload if the tasks changed, the queue was invalidated or the resync interval passed"""
+        if (self._loaded_at is None or time.monotonic() - self._loaded_at >= self.resync_seconds
+                or self.changed()):
+            self.load()
+            return True
+        return False
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def changed(self):
+        """True if a task was added, removed or rescheduled since the last load"""
+        self.stats["polls"] += 1
+        data_version = self._connection().execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return False
+        self._data_version = data_version
+        return self._read_queue_version() != self._queue_version
+
+    def __len__(self):
+        return len(self._heap)
+
+    def next_time(self):
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Remove and return the tasks due at now, highest priority first"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[3])
+        due.sort(key=lambda task: (-task['priority'], task['scheduled_time']))
+        return due
+
+    def wait(self, timeout):
+        """Sleep up to timeout seconds; returns True early if woken or the tasks changed (already reloaded)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._wake.wait(min(self.wake_poll, remaining)):
+                self._wake.clear()
+                return True
+            if self.changed():
+                self.load()
+                return True
+
+    def wake(self):
+        """End a wait() from another thread"""
+        self._wake.set()
+
+    def close(self):
+        if self._db_conn is not None:
+            self._db_conn.close()
+            self._db_conn = None
+
+    def _connection(self):
+        if self._db_conn is None:
+            self._db_conn = database_manager.open_connection(self.database_path)
+            ensure_tracking(self._db_conn)
+        return self._db_conn
+
+    def _read_queue_version(self):
+        return self._connection().execute("SELECT version FROM task_queue_version WHERE id = 1").fetchone()[0]
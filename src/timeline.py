@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Timeline engine for in-game effects
+Schedules delayed RCON cues (bells, countdowns, fireworks) on a background
+timer thread so the caller returns immediately. Cues from different sequences
+interleave by due time, so several effects can play at once.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+class timeline():
+
+    def __init__(self, execute, on_error=None):
+        self._execute = execute
+        self._on_error = on_error
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = 0
+        self._thread = None
+        self.stats = {"scheduled": 0, "played": 0, "failed": 0, "max_lag_ms": 0}
+
+    def schedule(self, delay, cmds, note=None, callback=None):
+        """Play cmds after delay seconds; note is passed to callback once the cue has played"""
+        due = time.monotonic() + max(0.0, delay)
+        with self._cond:
+            heapq.heappush(self._queue, (due, next(self._seq), cmds, note, callback))
+            self.stats["scheduled"] += 1
+            self._ensure_thread()
+            self._cond.notify_all()
+        return due
+
+    def call(self, delay, func):
+        """Run func() on the timer thread after delay seconds, e.g. to schedule cues that depend on the game state then"""
+        return self.schedule(delay, None, callback=lambda note: func())
+
+    def sequence(self, cues, start=0.0, callback=None):
+        """Schedule (offset, cmds[, note]) cues relative to start; returns the offset of the last cue"""
+        last = start
+        for cue in cues:
+            offset, cmds = cue[0], cue[1]
+            note = cue[2] if len(cue) > 2 else None
+            self.schedule(start + offset, cmds, note=note, callback=callback)
+            last = max(last, start + offset)
+        return last
+
+    def pending(self):
+        with self._cond:
+            return len(self._queue) + self._running
+
+    def last_due(self):
+        """Seconds until the last queued cue is due (0 if overdue), or None when nothing is queued"""
+        with self._cond:
+            if not self._queue:
+                return None
+            return max(0.0, max(entry[0] for entry in self._queue) - time.monotonic())
+
+    def wait(self, timeout=None):
+        """Block until every scheduled cue has played; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def drain(self):
+        """Play every queued cue now on the calling thread, in due order; returns how many were played"""
+        played = 0
+        while True:
+            with self._cond:
+                if not self._queue:
+                    return played
+                _, _, cmds, note, callback = heapq.heappop(self._queue)
+                self._running += 1
+            self._play(cmds, note, callback)
+            played += 1
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="timeline", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                due, _, cmds, note, callback = self._queue[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._queue)
+                self._running += 1
+                self.stats["max_lag_ms"] = max(self.stats["max_lag_ms"], int(-delay * 1000))
+            self._play(cmds, note, callback)
+
+    def _play(self, cmds, note, callback):
+        try:
+            if cmds is not None:
+                self._execute(cmds)
+            self.stats["played"] += 1
+            if callback is not None:
+                callback(note)
+        except Exception as e:
+            self.stats["failed"] += 1
+            if self._on_error is not None:
+                self._on_error(e, cmds)
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
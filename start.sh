@@ -58,9 +58,12 @@ fi
 
 # Start gunicorn
 echo "🌐 Starting web application with gunicorn..."
+# gthread workers: each live log stream (SSE) holds a thread, not a whole worker
 gunicorn \
     --bind 0.0.0.0:8080 \
-    --workers 4 \
+    --workers 2 \
+    --worker-class gthread \
+    --threads 16 \
     --timeout 120 \
     --daemon \
     --pid /tmp/gunicorn.pid \
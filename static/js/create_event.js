@@ -223,6 +223,9 @@ function setupEventListeners() {
     document.getElementById('name').addEventListener('input', updatePreview);
     document.getElementById('description').addEventListener('input', updatePreview);
     document.getElementById('timezone').addEventListener('change', updatePreview);
+    document.getElementById('repeat').addEventListener('change', function() {
+        document.getElementById('repeat-options').style.display = this.value === 'none' ? 'none' : 'block';
+    });
 }
 
 // Initialize with current time + 1 hour
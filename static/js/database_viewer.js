@@ -212,6 +212,74 @@ function loadTable(tableName) {
         });
 }
 
+let logSearchCursor = null;
+let logSearchRows = [];
+
+function localInputToUtc(elementId) {
+    const value = document.getElementById(elementId).value;
+    if (!value) {
+        return '';
+    }
+    return new Date(value).toISOString().replace(/\.\d{3}Z$/, 'Z');
+}
+
+function searchLogs(loadMore = false) {
+    const resultsDiv = document.getElementById('log-search-results');
+    const params = new URLSearchParams({
+        q: document.getElementById('log-search-text').value.trim(),
+        level: document.getElementById('log-search-level').value,
+        since: localInputToUtc('log-search-since'),
+        until: localInputToUtc('log-search-until'),
+        limit: 100
+    });
+
+    if (loadMore && logSearchCursor) {
+        params.set('cursor', logSearchCursor);
+    } else {
+        logSearchRows = [];
+        resultsDiv.innerHTML = '<div class="loading">Searching logs...</div>';
+    }
+
+    const started = performance.now();
+    fetch(`/api/logs/search?${params}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.error) {
+                resultsDiv.innerHTML = `<div class="alert alert-danger">Error: ${data.error}</div>`;
+                return;
+            }
+
+            logSearchRows = logSearchRows.concat(data.results);
+            logSearchCursor = data.next_cursor;
+            const elapsed = Math.round(performance.now() - started);
+
+            if (logSearchRows.length === 0) {
+                resultsDiv.innerHTML = '<div class="alert alert-info">No matching log entries.</div>';
+                return;
+            }
+
+            let html = '<div class="table-responsive"><table>';
+            html += '<thead><tr><th>id</th><th>timestamp</th><th>log_level</th><th>message</th></tr></thead><tbody>';
+            logSearchRows.forEach(row => {
+                const message = row.message.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+                html += `<tr><td>${row.id}</td><td><small>${new Date(row.timestamp).toLocaleString()}</small></td>`;
+                html += `<td>${row.log_level}</td><td>${message}</td></tr>`;
+            });
+            html += '</tbody></table></div>';
+
+            html += `<div class="pagination-info">Showing ${logSearchRows.length} matches (${data.engine}, ${elapsed}ms)`;
+            if (logSearchCursor) {
+                html += ' <button class="refresh-btn" onclick="searchLogs(true)">Load more</button>';
+            }
+            html += '</div>';
+
+            resultsDiv.innerHTML = html;
+        })
+        .catch(error => {
+            resultsDiv.innerHTML = `<div class="alert alert-danger">Failed to search logs: ${error}</div>`;
+        });
+}
+
 function executeQuery() {
     const query = document.getElementById('query-input').value.trim();
     if (!query) {
@@ -115,6 +115,42 @@ async function checkRconHealth() {
     updateOverallHealth();
 }
 
+async function checkLimiterState() {
+    try {
+        const res = await fetch("/api/health/rcon-limiter");
+        const data = await res.json();
+
+        if (data.status === 'idle' && data.rate_per_second === undefined) {
+            updateHealthCard('limiter', 'checking', 'Idle', {
+                'Last Update': data.message || '-'
+            });
+            return;
+        }
+
+        const statusMap = {
+            ok: ['healthy', 'Running'],
+            backing_off: ['unhealthy', 'Backing off'],
+            idle: ['checking', 'Idle']
+        };
+        const [cardStatus, statusText] = statusMap[data.status] || statusMap.idle;
+        const waiting = data.waiting || {};
+
+        updateHealthCard('limiter', cardStatus, statusText, {
+            'Rate': `${data.rate_per_second} cmd/s (${data.min_rate}-${data.max_rate})`,
+            'Tokens': `${data.tokens} / ${data.burst}`,
+            'Reply Latency': data.latency_ms !== null ? `${data.latency_ms}ms (target ${data.target_latency_ms}ms)` : '-',
+            'Tick Time': data.mspt !== null ? `${data.mspt}ms (target ${data.target_mspt}ms)` : 'Not polled',
+            'Waiting': `announce ${waiting.announce || 0}, normal ${waiting.normal || 0}, bulk ${waiting.bulk || 0}`,
+            'Backoffs': (data.stats && data.stats.backoffs) || 0,
+            'Last Update': data.age_seconds !== null ? `${data.age_seconds}s ago` : '-'
+        });
+    } catch (error) {
+        updateHealthCard('limiter', 'unhealthy', 'Error', {
+            'Last Update': error.message
+        });
+    }
+}
+
 function updateHealthCard(type, status, statusText, details) {
     const card = document.getElementById(`${type}-card`);
     const indicator = document.getElementById(`${type}-indicator`);
@@ -201,6 +237,35 @@ async function refreshSystemStatus() {
     await checkRconHealth();
 }
 
+const LIVE_LOG_LINES = 200;
+let logSource = null;
+
+function appendLogLine(entry) {
+    const viewer = document.getElementById("logViewer");
+    const line = document.createElement("div");
+    line.textContent = `${entry.timestamp}: [${entry.log_level}] ${entry.message}`;
+    viewer.insertBefore(line, viewer.firstChild);
+    while (viewer.childNodes.length > LIVE_LOG_LINES) {
+        viewer.removeChild(viewer.lastChild);
+    }
+}
+
+function connectLogStream() {
+    const status = document.getElementById("live-logs-status");
+
+    // EventSource reconnects by itself and resumes from the last row id it received
+    logSource = new EventSource("/api/logs/stream");
+    logSource.addEventListener("open", () => {
+        status.textContent = "Live";
+    });
+    logSource.addEventListener("log", (event) => {
+        appendLogLine(JSON.parse(event.data));
+    });
+    logSource.addEventListener("error", () => {
+        status.textContent = "Reconnecting...";
+    });
+}
+
 // Initialize event listeners and auto-refresh
 document.addEventListener("DOMContentLoaded", () => {
     // Set up button event listeners
@@ -211,9 +276,14 @@ document.addEventListener("DOMContentLoaded", () => {
     refreshStatus();
     checkMinecraftHealth();
     checkRconHealth();
+    checkLimiterState();
+    connectLogStream();
 
     // Auto-refresh status every 30 seconds
     setInterval(refreshStatus, 30000);
+
+    // Limiter state changes quickly while an event action runs
+    setInterval(checkLimiterState, 5000);
     
     // Auto-refresh health checks every 60 seconds
     setInterval(() => {
@@ -3,6 +3,7 @@
 // Load settings on page load
 document.addEventListener('DOMContentLoaded', function() {
     loadSettings();
+    loadLogLevels();
 });
 
 async function loadSettings() {
@@ -129,6 +130,67 @@ async function saveSettings() {
     }
 }
 
+async function loadLogLevels() {
+    const container = document.getElementById('log-levels');
+    
+    try {
+        const response = await fetch('/api/settings/log-levels');
+        const data = await response.json();
+        
+        if (data.error) {
+            showStatus('logging-status', 'error', 'Failed to load log levels: ' + data.error);
+            return;
+        }
+        
+        container.innerHTML = '';
+        data.modules.forEach(module => {
+            const inherit = module === 'default'
+                ? `LOG_LEVEL (${data.env_default})`
+                : 'Inherit default';
+            const options = [`<option value="">${inherit}</option>`]
+                .concat(data.levels.map(level => `<option value="${level}">${level}</option>`));
+            
+            const group = document.createElement('div');
+            group.className = 'form-group';
+            group.innerHTML = `
+                <label for="log-level-${module}">${module}</label>
+                <select id="log-level-${module}">${options.join('')}</select>
+            `;
+            container.appendChild(group);
+            
+            const select = group.querySelector('select');
+            select.value = data.overrides[module] || '';
+            select.addEventListener('change', () => saveLogLevel(module, select.value));
+        });
+        
+    } catch (error) {
+        showStatus('logging-status', 'error', 'Error loading log levels: ' + error.message);
+    }
+}
+
+async function saveLogLevel(module, level) {
+    try {
+        const response = await fetch('/api/settings/log-levels', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ module: module, level: level })
+        });
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            showStatus('logging-status', 'success', '✅ ' + data.message);
+        } else {
+            showStatus('logging-status', 'error', '❌ Failed to save log level: ' + data.error);
+        }
+        
+    } catch (error) {
+        showStatus('logging-status', 'error', '❌ Error saving log level: ' + error.message);
+    }
+}
+
 function showStatus(elementId, type, message) {
     const element = document.getElementById(elementId);
     